@@ -1,9 +1,210 @@
 # agent_base.py
+import time
+
+from symmetry import canonical, to_canonical_action, from_canonical_action, unique_actions
+from transposition import EXACT
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when the per-move time budget runs out."""
+
+
+class SearchStats:
+    """
+    Counters filled in by an agent's search when agent.stats is set (see
+    Agent.enable_stats). They accumulate until reset(); callers that want
+    per-move numbers reset before each get_action.
+
+    nodes       calls of the search function (including the root)
+    terminals   nodes where the game was over
+    evals       heuristic evaluations at the depth limit
+    cutoffs     alpha-beta prunes
+    tt_hits     nodes answered from the transposition table
+    max_depth   deepest ply reached (root is 0)
+    ply_nodes   nodes per ply, ply_expanded: nodes per ply whose moves were
+                searched, so branching(ply) is the average number of
+                children searched per expanded node
+    """
+
+    __slots__ = ("nodes", "terminals", "evals", "cutoffs", "tt_hits", "max_depth",
+                 "ply_nodes", "ply_expanded")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.terminals = 0
+        self.evals = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.max_depth = 0
+        self.ply_nodes = []
+        self.ply_expanded = []
+
+    def enter(self, ply):
+        """Counts one node at ply."""
+        self.nodes += 1
+        if ply >= len(self.ply_nodes):
+            self.ply_nodes.extend([0] * (ply + 1 - len(self.ply_nodes)))
+            self.ply_expanded.extend([0] * (ply + 1 - len(self.ply_expanded)))
+            if ply > self.max_depth:
+                self.max_depth = ply
+        self.ply_nodes[ply] += 1
+
+    def expand(self, ply):
+        """Counts one node at ply whose children are about to be searched."""
+        self.ply_expanded[ply] += 1
+
+    @property
+    def leaves(self):
+        return self.terminals + self.evals
+
+    def branching(self, ply):
+        """Average children searched per expanded node at ply."""
+        if ply + 1 >= len(self.ply_nodes) or not self.ply_expanded[ply]:
+            return 0.0
+        return self.ply_nodes[ply + 1] / self.ply_expanded[ply]
+
+    def merge(self, other):
+        """Adds the counts of other (e.g. from a parallel search worker)."""
+        self.nodes += other.nodes
+        self.terminals += other.terminals
+        self.evals += other.evals
+        self.cutoffs += other.cutoffs
+        self.tt_hits += other.tt_hits
+        self.max_depth = max(self.max_depth, other.max_depth)
+        missing = len(other.ply_nodes) - len(self.ply_nodes)
+        if missing > 0:
+            self.ply_nodes.extend([0] * missing)
+            self.ply_expanded.extend([0] * missing)
+        for ply, n in enumerate(other.ply_nodes):
+            self.ply_nodes[ply] += n
+        for ply, n in enumerate(other.ply_expanded):
+            self.ply_expanded[ply] += n
+
+    def __str__(self):
+        return (f"nodes={self.nodes}  evals={self.evals}  terminals={self.terminals}  "
+                f"cutoffs={self.cutoffs}  tt_hits={self.tt_hits}  max_depth={self.max_depth}")
+
+    def as_dict(self):
+        return {"nodes": self.nodes, "terminals": self.terminals, "evals": self.evals,
+                "cutoffs": self.cutoffs, "tt_hits": self.tt_hits, "max_depth": self.max_depth,
+                "branching": [round(self.branching(p), 3) for p in range(len(self.ply_nodes) - 1)]}
+
+
+# key spaces (see Agent.tt_key) past the plain TT_SPACE kinds, numbered in
+# the order they are first used in this process; tables are never shared
+# between processes
+_TT_SPACES = {}
+_FIRST_SPACE = 16
+
+
+def _space_number(space):
+    """Number of the key space described by the tuple space."""
+    if len(space) == 1:
+        return space[0]
+    number = _TT_SPACES.get(space)
+    if number is None:
+        number = _TT_SPACES[space] = _FIRST_SPACE + len(_TT_SPACES)
+    return number
+
 
 class Agent:
+    # kind of value the agent's table entries hold (see tt_space). Agents
+    # storing the same kind (minimax values for X: MinimaxAgent and
+    # AlphaBetaAgent) share entries in one table; the others get a space of
+    # their own, so a table can be shared by any of them without clashes
+    TT_SPACE = 0
+    # hybrid mode settings (see endgame.py), for the agents that have it
+    hybrid = False
+    endgame = None
+    extend = False
+    # number of the key space of tt_space(), set on first use
+    _tt_space = None
+
+    def __init__(self, tt=None, symmetry=False):
+        # optional TranspositionTable, kept across get_action calls and games
+        self.tt = tt
+        # when True, table keys are canonical under the board symmetries and
+        # searches skip moves that are symmetric to one already tried
+        self.symmetry = symmetry
+        # SearchStats while instrumentation is on; searches only pay for a
+        # None check per node otherwise
+        self.stats = None
+        # X's value of the position searched by the last get_action (None if
+        # the agent has none), e.g. to record alongside the chosen move
+        self.last_value = None
+
+    def __getstate__(self):
+        # key space numbers are only valid in the process that made them
+        state = self.__dict__.copy()
+        state["_tt_space"] = None
+        return state
+
+    def enable_stats(self):
+        """Turns on search instrumentation and returns the SearchStats."""
+        if self.stats is None:
+            self.stats = SearchStats()
+        return self.stats
+
     def get_action(self, state, depth=None):
         """
-        Given a GameState, return an integer action (0..8).
+        Given a GameState, return an integer action (a cell index, 0..8 on 3x3).
         depth: optional search depth limit (None means full search).
         """
         raise NotImplementedError("Override in subclass")
+
+    def legal_actions(self, state):
+        """Moves to search from state (one per symmetry class if enabled)."""
+        if self.symmetry:
+            return [a for a, _ in unique_actions(state)]
+        return state.get_legal_actions()
+
+    def tt_space(self):
+        """
+        What the stored values depend on besides the position, as a tuple:
+        agents with equal tt_space() share entries. Hybrid values at the
+        depth limit depend on the hybrid settings, so those are part of it.
+        """
+        if self.hybrid:
+            return self.TT_SPACE, self.endgame, self.extend
+        return (self.TT_SPACE,)
+
+    def tt_key(self, state):
+        """Returns (key, s); s is the symmetry used for the key, or None."""
+        if self.symmetry:
+            key, s = canonical(state)
+        else:
+            key, s = state.key(), None
+        space = self._tt_space
+        if space is None:
+            space = self._tt_space = _space_number(self.tt_space())
+        if space:
+            # above the position bits (both masks and the side to move)
+            key |= space << (2 * state.geom.cells + 1)
+        return key, s
+
+    def tt_probe(self, key, s):
+        """Table entry for key with its action mapped back onto the searched board."""
+        entry = self.tt.probe(key)
+        if entry is not None and s is not None and entry[1] is not None:
+            entry = (entry[0], from_canonical_action(entry[1], s), entry[2], entry[3])
+        return entry
+
+    def tt_store(self, key, s, value, action, depth, flag=EXACT):
+        if s is not None and action is not None:
+            action = to_canonical_action(action, s)
+        self.tt.store(key, value, action, depth, flag)
+
+
+def timed_get_action(agent, state, depth=None):
+    """
+    Calls agent.get_action and returns (action, milliseconds). With stats
+    enabled, agent.stats holds the counts of this move only.
+    """
+    if agent.stats is not None:
+        agent.stats.reset()
+    t0 = time.perf_counter()
+    action = agent.get_action(state, depth)
+    return action, (time.perf_counter() - t0) * 1000.0
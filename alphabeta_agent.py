@@ -1,15 +1,70 @@
 # alphabeta_agent.py
-from agent_base import Agent
+import time
+
+from agent_base import Agent, SearchTimeout
 from game import GameState
-from evaluation import betterEvaluationFunction
+from evaluation import betterEvaluationFunction, IncrementalEvaluator, evaluate_children, heuristic_bound
+from endgame import EndgameSolver, forced_move
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from move_ordering import MoveOrderer
+from parallel import parallel_alphabeta
+
 
 class AlphaBetaAgent(Agent):
+    def __init__(self, tt=None, symmetry=False, time_ms=None, ordering=None, workers=None,
+                 incremental_eval=True, batch_eval=False, endgame=None, extend=False):
+        super().__init__(tt=tt, symmetry=symmetry)
+        if time_ms is not None and workers and workers > 1:
+            # iterative deepening searches serially; the root split is not
+            # applied to its iterations
+            raise ValueError("time_ms cannot be combined with workers > 1")
+        # per-move budget in milliseconds; when set, get_action deepens
+        # iteratively and answers from the deepest finished iteration
+        self.time_ms = time_ms
+        # optional MoveOrderer; its history table is kept between searches
+        self.ordering = ordering
+        self._ordering = ordering
+        # with workers > 1 the root moves are searched in a process pool
+        self.workers = workers
+        # depth-limited searches update the evaluation move by move
+        self.incremental_eval = incremental_eval
+        # score all children of a node just above the depth limit in one
+        # evaluate_children call; pays off on wide boards with NumPy
+        self.batch_eval = batch_eval
+        # hybrid mode (see endgame.py): positions at the depth limit with at
+        # most `endgame` empty cells are solved exactly, forcing ones are
+        # searched one ply further (extend), and the heuristic is scaled
+        # below the value of a win
+        self.endgame = endgame
+        self.extend = extend
+        self.hybrid = endgame is not None or extend
+        self.solver = EndgameSolver() if endgame is not None else None
+        self._evaluator = None
+        self._deadline = None
+
     def get_action(self, state: GameState, depth=None):
         """
-        Returns the best move index (0-8) for Tic-Tac-Toe using Alpha-Beta pruning.
+        Returns the best move index (0-8 on 3x3) using Alpha-Beta pruning.
         """
-        value, action = self.alphabeta(state, alpha=float('-inf'), beta=float('inf'),
-                                       depth_limit=depth, current_depth=0)
+        if self.ordering is not None:
+            self.ordering.new_search()
+        if self.time_ms is not None:
+            action = self.iterative_deepening(state, depth)
+        elif self.workers and self.workers > 1 and not state.is_terminal() and depth != 0:
+            root = state.copy()
+            actions = self.legal_actions(root)
+            if self._ordering is not None:
+                actions = self._ordering.order(root, actions, 0)
+            self.last_value, action = parallel_alphabeta(self, root, actions, depth)
+        else:
+            # search on a private copy, moves are made and undone in place
+            root = state.copy()
+            self._evaluator = self.make_evaluator(root, depth)
+            try:
+                self.last_value, action = self.alphabeta(root, alpha=float('-inf'), beta=float('inf'),
+                                                         depth_limit=depth, current_depth=0)
+            finally:
+                self._evaluator = None
         # Safety fallback (never return None)
         if action is None:
             legal = state.get_legal_actions()
@@ -17,41 +72,213 @@ class AlphaBetaAgent(Agent):
                 action = legal[0]
         return action
 
+    def worker_copy(self):
+        """Agent with the same settings and empty tables, for parallel search workers."""
+        tt = TranspositionTable(self.tt.max_size, self.tt.policy) if self.tt is not None else None
+        ordering = MoveOrderer(self.ordering.strategies) if self.ordering is not None else None
+        agent = AlphaBetaAgent(tt=tt, symmetry=self.symmetry, ordering=ordering,
+                               incremental_eval=self.incremental_eval, batch_eval=self.batch_eval,
+                               endgame=self.endgame, extend=self.extend)
+        if self.stats is not None:
+            agent.enable_stats()
+        return agent
+
+    def make_evaluator(self, root, depth):
+        """IncrementalEvaluator for a search from root, or None if not needed."""
+        if depth is None or not self.incremental_eval:
+            return None
+        return IncrementalEvaluator(root)
+
+    def iterative_deepening(self, state: GameState, depth=None):
+        """
+        Searches depth 1, 2, ... (up to depth, or to the end of the game)
+        until self.time_ms runs out, and returns the best move of the deepest
+        iteration that finished. Each iteration tries the best moves found
+        by the previous one first (the "pv" ordering, added if self.ordering
+        does not already use it). Depth 1 always finishes.
+        """
+        max_depth = state.empty_count()
+        if depth is not None:
+            max_depth = min(max_depth, depth)
+        deadline = time.perf_counter() + self.time_ms / 1000.0
+        if self.ordering is None or not self.ordering.use_pv:
+            self._ordering = MoveOrderer(("pv",) + (self.ordering.strategies if self.ordering else ()))
+            if self.ordering is not None:
+                self._ordering.history = self.ordering.history
+        best_action = None
+        try:
+            for d in range(1, max_depth + 1):
+                root = state.copy()
+                # a timeout leaves root and the evaluator mid-search, so
+                # every iteration starts from fresh ones
+                self._evaluator = self.make_evaluator(root, d)
+                try:
+                    value, action = self.alphabeta(root, float('-inf'), float('inf'),
+                                                   depth_limit=d, current_depth=0)
+                except SearchTimeout:
+                    break
+                best_action = action
+                self.last_value = value
+                # only the first iteration runs without a clock
+                self._deadline = deadline
+        finally:
+            self._deadline = None
+            self._evaluator = None
+            self._ordering = self.ordering
+        return best_action
+
     def alphabeta(self, state: GameState, alpha, beta, depth_limit, current_depth):
         """
         Recursive alpha-beta search returning (value, best_action).
         """
+        # 0) give up if the time budget ran out
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        stats = self.stats
+        if stats is not None:
+            stats.enter(current_depth)
         # 1) stop if game ended
         if state.is_terminal():
+            if stats is not None:
+                stats.terminals += 1
             return state.utility(), None
         # 2) stop if we hit the depth limit, use heuristic
+        evaluator = self._evaluator
         if depth_limit is not None and current_depth >= depth_limit:
-            return betterEvaluationFunction(state), None
+            # with a time budget the solve runs on the clock too, and is left
+            # out of the first iteration, which has none
+            if (self.solver is not None and state.empty_count() <= self.endgame
+                    and (self.time_ms is None or self._deadline is not None)):
+                return self.solver.solve(state, stats, current_depth, self._deadline), None
+            if self.extend:
+                value, block = forced_move(state)
+                if value is not None:
+                    if stats is not None:
+                        stats.evals += 1
+                    return value, None
+                if block is not None:
+                    # every other move loses at once: follow the block one ply further
+                    if stats is not None:
+                        stats.expand(current_depth)
+                    player = state.to_move
+                    state.make_move(block)
+                    if evaluator is not None:
+                        evaluator.apply(block, player)
+                    value, _ = self.alphabeta(state, alpha, beta, depth_limit + 1, current_depth + 1)
+                    state.undo_move(block)
+                    if evaluator is not None:
+                        evaluator.revert(block, player)
+                    return value, block
+            if stats is not None:
+                stats.evals += 1
+            if evaluator is not None:
+                value = evaluator.value(state)
+            else:
+                value = betterEvaluationFunction(state)
+            if self.hybrid:
+                value /= heuristic_bound(state.geom)
+            return value, None
+
+        remaining = state.empty_count()
+        if depth_limit is not None:
+            remaining = min(remaining, depth_limit - current_depth)
 
-        # 3) maximizer turn
+        # 3) reuse a stored result if it is exact or already outside the window
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            key, sym = self.tt_key(state)
+            entry = self.tt_probe(key, sym)
+            if entry is not None:
+                val, act, entry_depth, flag = entry
+                if entry_depth == remaining and (
+                        flag == EXACT or (flag == LOWER and val >= beta)
+                        or (flag == UPPER and val <= alpha)):
+                    if stats is not None:
+                        stats.tt_hits += 1
+                    return val, act
+                # a stored best move is still a good first guess
+                hash_move = act
+            alpha0, beta0 = alpha, beta
+
+        # 4) order the moves so the likely best one is tried first
+        actions = self.legal_actions(state)
+        ordering = self._ordering
+        if ordering is not None:
+            pv_key = state.key()
+            actions = ordering.order(state, actions, current_depth, hash_move)
+        if stats is not None:
+            stats.expand(current_depth)
+        # every child is at the depth limit: score them all at once
+        leaf_values = None
+        if (self.batch_eval and not self.hybrid and depth_limit is not None
+                and current_depth + 1 >= depth_limit):
+            leaf_values = evaluate_children(state, actions, evaluator)
+
+        # 5) maximizer turn
         if state.to_move == 'X':
             best_val = float('-inf')
             best_act = None
-            for a in state.get_legal_actions():
-                succ = state.generate_successor(a)
-                val, _ = self.alphabeta(succ, alpha, beta, depth_limit, current_depth + 1)
+            for i, a in enumerate(actions):
+                if leaf_values is not None:
+                    val = leaf_values[i]
+                    if stats is not None:
+                        stats.enter(current_depth + 1)
+                        stats.evals += 1
+                else:
+                    state.make_move(a)
+                    if evaluator is not None:
+                        evaluator.apply(a, 'X')
+                    val, _ = self.alphabeta(state, alpha, beta, depth_limit, current_depth + 1)
+                    state.undo_move(a)
+                    if evaluator is not None:
+                        evaluator.revert(a, 'X')
                 if val > best_val:
                     best_val, best_act = val, a
                 alpha = max(alpha, best_val)
                 if alpha >= beta:  # prune
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    if ordering is not None:
+                        ordering.record_cutoff(a, current_depth, remaining)
                     break
-            return best_val, best_act
 
-        # 4) minimizer turn
+        # 6) minimizer turn
         else:
             best_val = float('inf')
             best_act = None
-            for a in state.get_legal_actions():
-                succ = state.generate_successor(a)
-                val, _ = self.alphabeta(succ, alpha, beta, depth_limit, current_depth + 1)
+            for i, a in enumerate(actions):
+                if leaf_values is not None:
+                    val = leaf_values[i]
+                    if stats is not None:
+                        stats.enter(current_depth + 1)
+                        stats.evals += 1
+                else:
+                    state.make_move(a)
+                    if evaluator is not None:
+                        evaluator.apply(a, 'O')
+                    val, _ = self.alphabeta(state, alpha, beta, depth_limit, current_depth + 1)
+                    state.undo_move(a)
+                    if evaluator is not None:
+                        evaluator.revert(a, 'O')
                 if val < best_val:
                     best_val, best_act = val, a
                 beta = min(beta, best_val)
                 if beta <= alpha:  # prune
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    if ordering is not None:
+                        ordering.record_cutoff(a, current_depth, remaining)
                     break
-            return best_val, best_act
+
+        if ordering is not None and best_act is not None:
+            ordering.record_best(pv_key, best_act)
+        if tt is not None:
+            if best_val <= alpha0:
+                flag = UPPER
+            elif best_val >= beta0:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt_store(key, sym, best_val, best_act, remaining, flag)
+        return best_val, best_act
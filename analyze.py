@@ -0,0 +1,289 @@
+# analyze.py
+#
+# Bulk position analysis: scores every board of a file (or stdin) with one
+# agent and depth and writes the agent's value and best move per board, in
+# input order, as JSON lines or CSV.
+#
+# Input is read as a stream, one board per line: the cells row by row, "X",
+# "O" and "." (or "-") for empty, optionally with "/" between rows as in the
+# benchmark corpus ("X../.O./..."). The side to move follows from the counts
+# (X moves first). Blank lines and lines starting with "#" are skipped;
+# malformed boards get a record with an error instead of stopping the run.
+#
+# Boards are deduplicated by their symmetry-canonical key, so each class of
+# equivalent positions is searched once and the move is mapped back onto
+# every board of the class. Unique positions are searched in batches in a
+# process pool; every worker keeps one agent for the whole run, so its
+# transposition table (--tt-size) is shared by all the positions it
+# searches. At most two batches per worker are in flight and at most
+# --max-buffer boards wait for their turn to be written, so memory stays
+# flat however long the input is.
+#
+# Usage:
+#   python analyze.py games.txt --agent AlphaBetaAgent --out analysis.jsonl
+#   python analyze.py games.txt --agent ExpectimaxAgent --size 4 --k 3 --depth 3 --jobs 8 \
+#       --out analysis.csv
+#   zcat human_games.txt.gz | python analyze.py - --depth 4 > analysis.jsonl
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from agent_base import timed_get_action
+from game import GameState, parse_board_size
+from measure_metrics import make_agent
+from symmetry import canonical, from_canonical_action
+from tournament import AGENTS
+
+FIELDS = ["line", "board", "to_move", "move", "value", "error"]
+
+# worker process globals
+_config = None
+_agent = None
+
+
+def _init_worker(config):
+    global _config, _agent
+    _config = config
+    # one agent per worker, kept for the whole run: its tables carry over
+    # from one position to the next
+    _agent = make_agent(config["agent"], **config["agent_options"])
+
+
+def _analyze_batch(keys):
+    """Searches canonical keys; returns (key, canonical move, value for X, nodes) per key."""
+    c = _config
+    agent = _agent
+    results = []
+    for key in keys:
+        state = GameState.from_key(key, c["rows"], c["cols"], c["k"])
+        action, _ = timed_get_action(agent, state, c["depth"])
+        results.append((key, action, agent.last_value, agent.stats.nodes))
+    return results
+
+
+def parse_board(text, rows=3, cols=3, k=3):
+    """GameState for one input board (see the top of this file)."""
+    cells = text.replace("/", "")
+    if len(cells) != rows * cols:
+        raise ValueError(f"board has {len(cells)} cells, expected {rows * cols}")
+    board = []
+    for c in cells.upper():
+        if c in "XO":
+            board.append(c)
+        elif c in ".-":
+            board.append(None)
+        else:
+            raise ValueError(f"unexpected character {c!r}")
+    x_count, o_count = board.count("X"), board.count("O")
+    if x_count not in (o_count, o_count + 1):
+        raise ValueError(f"{x_count} X and {o_count} O cannot come from a game")
+    return GameState(board=board, to_move='X' if x_count == o_count else 'O', rows=rows, cols=cols, k=k)
+
+
+class _InlineExecutor:
+    """Runs submitted calls at once in this process (jobs=1)."""
+
+    def __init__(self, initializer, initargs):
+        initializer(*initargs)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def analyze(lines, config, emit, jobs=None, batch_size=64, max_buffer=100000, cache_size=1000000):
+    """
+    Analyzes the boards in lines (an iterable of strings) and calls
+    emit(line_number, board, to_move, move, value, error) for each of them,
+    in input order. Returns counters of the run.
+    """
+    # checked here: make_agent failing in the workers' initializer would
+    # only show up as a broken pool
+    if config["agent"] not in AGENTS:
+        raise ValueError(f"Unknown agent name: {config['agent']}")
+    rows, cols, k = config["rows"], config["cols"], config["k"]
+    counts = {"boards": 0, "searched": 0, "cached": 0, "errors": 0, "nodes": 0}
+    results = {}    # canonical key -> (canonical move, value)
+    waiting = {}    # canonical key -> entries waiting for its search
+    buffer = deque()
+    batch = []
+    pending = set()
+
+    # an entry is [line number, board, to_move, symmetry, (move, value) or None, error]
+    def write_ready():
+        while buffer and (buffer[0][4] is not None or buffer[0][5] is not None):
+            number, text, to_move, s, result, error = buffer.popleft()
+            move = value = None
+            if result is not None:
+                move, value = result
+                if move is not None:
+                    move = from_canonical_action(move, s)
+            emit(number, text, to_move, move, value, error)
+
+    def submit():
+        pending.add(executor.submit(_analyze_batch, list(batch)))
+        batch.clear()
+
+    def collect():
+        nonlocal pending
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            for key, move, value, nodes in future.result():
+                counts["nodes"] += nodes
+                if len(results) >= cache_size:
+                    results.clear()
+                results[key] = (move, value)
+                for entry in waiting.pop(key):
+                    entry[4] = (move, value)
+        write_ready()
+
+    if jobs == 1:
+        executor = _InlineExecutor(_init_worker, (config,))
+    else:
+        jobs = jobs or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config,))
+    with executor:
+        for number, line in enumerate(lines, 1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            counts["boards"] += 1
+            entry = [number, text, None, None, None, None]
+            buffer.append(entry)
+            try:
+                state = parse_board(text, rows, cols, k)
+            except ValueError as e:
+                counts["errors"] += 1
+                entry[5] = str(e)
+                write_ready()
+                continue
+            entry[2] = state.to_move
+            if state.is_terminal():
+                entry[4] = (None, state.utility())
+                write_ready()
+                continue
+            key, entry[3] = canonical(state)
+            result = results.get(key)
+            if result is not None:
+                counts["cached"] += 1
+                entry[4] = result
+                write_ready()
+            elif key in waiting:
+                counts["cached"] += 1
+                waiting[key].append(entry)
+            else:
+                counts["searched"] += 1
+                waiting[key] = [entry]
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    submit()
+            # keep a couple of batches per worker queued, and the output buffer bounded
+            while len(pending) >= 2 * jobs or len(buffer) >= max_buffer:
+                if not pending:
+                    submit()
+                collect()
+        if batch:
+            submit()
+        while pending:
+            collect()
+    write_ready()
+    return counts
+
+
+class ResultWriter:
+    """Writes analysis records as JSON lines or CSV rows."""
+
+    def __init__(self, f, fmt="jsonl"):
+        self.f = f
+        self.fmt = fmt
+        if fmt == "csv":
+            self.csv = csv.writer(f)
+            self.csv.writerow(FIELDS)
+
+    def write(self, number, board, to_move, move, value, error):
+        if self.fmt == "csv":
+            self.csv.writerow([number, board, to_move or "", "" if move is None else move,
+                               "" if value is None else value, error or ""])
+        else:
+            record = {"line": number, "board": board, "to_move": to_move, "move": move, "value": value}
+            if error is not None:
+                record["error"] = error
+            self.f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a file of positions with one agent.")
+    parser.add_argument("input", nargs="?", default="-", help="File of boards, one per line (- = stdin)")
+    parser.add_argument("--agent", default="AlphaBetaAgent", choices=AGENTS,
+                        help="Agent that scores the positions")
+    parser.add_argument("--depth", type=int, default=None, help="Search depth (default: full)")
+    parser.add_argument("--size", type=parse_board_size, default=(3, 3),
+                        help="Board size, N or RxC (default: 3)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="Marks in a row needed to win (default: shorter side)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Worker processes (default: all CPUs, 1 = no pool)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Unique positions per pool task")
+    parser.add_argument("--max-buffer", type=int, default=100000,
+                        help="Boards held back at most while waiting for earlier ones")
+    parser.add_argument("--out", default="-", help="Output file (- = stdout; .csv for CSV)")
+    parser.add_argument("--format", default=None, choices=["jsonl", "csv"],
+                        help="Output format (default: from --out, else jsonl)")
+    parser.add_argument("--tt-size", type=int, default=1 << 20,
+                        help="Transposition table entries per worker, kept across positions (0 = none)")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="Store table entries under symmetry-canonical keys")
+    parser.add_argument("--ordering", default=None,
+                        help="Comma-separated move ordering heuristics (AlphaBetaAgent and negamax agents)")
+    parser.add_argument("--iterations", type=int, default=1000, help="MCTSAgent iterations per position")
+    parser.add_argument("--endgame", type=int, default=None,
+                        help="Hybrid mode: solve positions at the depth limit with at most N empty cells")
+    parser.add_argument("--extend", action="store_true",
+                        help="Hybrid mode: search forcing positions one ply further")
+    parser.add_argument("--table", default="solution_table.bin", help="Solution table file for TableAgent")
+    args = parser.parse_args()
+    rows, cols = args.size
+    fmt = args.format or ("csv" if args.out.endswith(".csv") else "jsonl")
+
+    config = {
+        "agent": args.agent, "rows": rows, "cols": cols,
+        "k": args.k if args.k is not None else min(rows, cols), "depth": args.depth,
+        "agent_options": {
+            "tt_size": args.tt_size or None, "symmetry": args.symmetry, "table_path": args.table,
+            "ordering": tuple(args.ordering.split(",")) if args.ordering else None,
+            "iterations": args.iterations, "endgame": args.endgame, "extend": args.extend,
+        },
+    }
+    src = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+    t0 = time.perf_counter()
+    try:
+        counts = analyze(src, config, ResultWriter(out, fmt).write, args.jobs, args.batch_size,
+                         args.max_buffer)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    # the summary goes to stderr, stdout may be the results
+    print(f"Analyzed {counts['boards']} boards in {elapsed:.1f} s: {counts['searched']} searched "
+          f"({counts['nodes']} nodes), {counts['cached']} repeated or symmetric, "
+          f"{counts['errors']} errors", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
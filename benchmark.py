@@ -0,0 +1,219 @@
+# benchmark.py
+#
+# Repeatable performance benchmark. Unlike measure_metrics.py, which plays
+# whole games and so mixes in the opponent's choices, every agent searches
+# the same fixed positions (CORPUS) from scratch: a fresh agent per search,
+# so transposition tables never carry over between repetitions.
+#
+# Each case (agent, board, depth) is run over its positions a few times
+# untimed (warm-up) and then --reps times timed. Every repetition is one
+# pass over the positions; nodes/sec and ms/move are averaged over the
+# repetitions with a 95% confidence interval.
+#
+# Usage:
+#   python benchmark.py --save baseline.json          # record a baseline
+#   python benchmark.py --compare baseline.json       # exit 1 on regression
+#   python benchmark.py --agents AlphaBetaAgent --sizes 3 --reps 20
+
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+
+from agent_base import timed_get_action
+from game import GameState, parse_board_size
+from measure_metrics import make_agent
+from online_stats import RunningStats
+
+# (name, category, k, board). Rows are separated by "/", "." is an empty
+# cell, and the side to move follows from the counts (X moves first).
+# Values for 3x3 are those of solution_table.py under perfect play.
+CORPUS = [
+    # 3x3: openings, all draws
+    ("empty",           "opening",     3, ".../.../..."),
+    ("center",          "opening",     3, ".../.X./..."),
+    ("corner",          "opening",     3, "X../.../..."),
+    ("corner-center",   "opening",     3, "X../.O./..."),
+    # 3x3: midgames
+    ("edge-center",     "midgame",     3, ".X./.O./..."),
+    ("opposite-corner", "midgame",     3, "X../.O./..X"),
+    ("side-attack",     "midgame",     3, ".X./XO./..."),
+    # 3x3: forced wins (X wins / O wins)
+    ("x-fork",          "forced-win",  3, "XO./.../..."),
+    ("x-double-threat", "forced-win",  3, "XO./.X./..O"),
+    ("x-block-fork",    "forced-win",  3, "X../OX./..O"),
+    ("o-fork",          "forced-win",  3, ".../O../.XX"),
+    ("o-edge-fork",     "forced-win",  3, ".O./..X/..X"),
+    # 3x3: forced draws
+    ("forced-block",    "forced-draw", 3, "X.O/.X./..."),
+    ("o-center-block",  "forced-draw", 3, "OX./.X./..."),
+    ("xox-line",        "forced-draw", 3, "XOX/.O./..."),
+    # 4x4, three in a row
+    ("4x4-empty",       "opening",     3, "..../..../..../...."),
+    ("4x4-center",      "opening",     3, "..../.X../..../...."),
+    ("4x4-midgame",     "midgame",     3, "..../.XO./.O../..X."),
+    ("4x4-x-threat",    "forced-win",  3, "O.../.XX./.O../...."),
+    # 5x5, four in a row
+    ("5x5-empty",       "opening",     4, "...../...../...../...../....."),
+    ("5x5-midgame",     "midgame",     4, "...../.XO../..X../..O../....."),
+]
+
+# (agent, (rows, cols), depth) run by default
+CASES = [
+    ("MinimaxAgent",    (3, 3), None),
+    ("AlphaBetaAgent",  (3, 3), None),
+    ("ExpectimaxAgent", (3, 3), None),
+    ("AlphaBetaAgent",  (3, 3), 3),
+    ("ExpectimaxAgent", (3, 3), 3),
+    ("NegamaxAgent",    (3, 3), None),
+    ("PVSAgent",        (3, 3), None),
+    ("MTDfAgent",       (3, 3), None),
+    ("AlphaBetaAgent",  (4, 4), 4),
+    ("NegamaxAgent",    (4, 4), 4),
+    ("PVSAgent",        (4, 4), 4),
+    ("MTDfAgent",       (4, 4), 4),
+    ("ExpectimaxAgent", (4, 4), 3),
+    ("AlphaBetaAgent",  (5, 5), 3),
+    ("PVSAgent",        (5, 5), 3),
+    ("MTDfAgent",       (5, 5), 3),
+]
+
+# two-sided 95% Student t quantiles by degrees of freedom
+_T95 = [None, 12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def parse_position(board, k):
+    """GameState for a CORPUS board string."""
+    rows = board.split("/")
+    cells = [None if c == "." else c for c in "".join(rows)]
+    x_count, o_count = cells.count("X"), cells.count("O")
+    return GameState(board=cells, to_move='X' if x_count == o_count else 'O',
+                     rows=len(rows), cols=len(rows[0]), k=k)
+
+
+def confidence_interval(stats):
+    """Half-width of the 95% confidence interval of stats.mean."""
+    if stats.n < 2:
+        return 0.0
+    df = stats.n - 1
+    t = _T95[df] if df < len(_T95) else 1.96
+    return t * stats.stdev / math.sqrt(stats.n)
+
+
+def case_key(agent, size, depth):
+    rows, cols = size
+    return f"{agent}/{rows}x{cols}/depth={'full' if depth is None else depth}"
+
+
+def run_case(agent_name, positions, depth, reps=5, warmup=1, agent_options=None):
+    """
+    Times agent_name on every position, warmup + reps passes. Returns a dict
+    of nodes/sec, ms/move (each with a 95% CI) and nodes/move.
+    """
+    agent_options = agent_options or {}
+    rate = RunningStats()
+    ms_per_move = RunningStats()
+    nodes_per_move = None
+    for rep in range(warmup + reps):
+        total_ms = 0.0
+        total_nodes = 0
+        for state in positions:
+            agent = make_agent(agent_name, **agent_options)
+            # keep collections of earlier garbage out of the timed search
+            gc.collect()
+            _, ms = timed_get_action(agent, state, depth)
+            total_ms += ms
+            total_nodes += agent.stats.nodes
+        if rep < warmup:
+            continue
+        rate.add(total_nodes / (total_ms / 1000.0) if total_ms else 0.0)
+        ms_per_move.add(total_ms / len(positions))
+        nodes_per_move = total_nodes / len(positions)
+    return {
+        "positions": len(positions), "reps": reps,
+        "nodes_per_sec": rate.mean, "nodes_per_sec_ci": confidence_interval(rate),
+        "ms_per_move": ms_per_move.mean, "ms_per_move_ci": confidence_interval(ms_per_move),
+        "nodes_per_move": nodes_per_move,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of results against a baseline: lines describing every case
+    whose nodes/sec dropped, or whose nodes/move grew, by more than threshold.
+    """
+    failures = []
+    for key, res in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if res["nodes_per_sec"] < base["nodes_per_sec"] * (1 - threshold):
+            failures.append(f"{key}: nodes/sec {res['nodes_per_sec']:.0f} < baseline "
+                            f"{base['nodes_per_sec']:.0f} - {100 * threshold:.0f}%")
+        if res["nodes_per_move"] > base["nodes_per_move"] * (1 + threshold):
+            failures.append(f"{key}: nodes/move {res['nodes_per_move']:.1f} > baseline "
+                            f"{base['nodes_per_move']:.1f} + {100 * threshold:.0f}%")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agents on a fixed corpus of positions.")
+    parser.add_argument("--agents", default=None,
+                        help="Comma-separated agents to keep from the default cases")
+    parser.add_argument("--sizes", default=None,
+                        help="Comma-separated board sizes to keep, e.g. 3,4x4")
+    parser.add_argument("--reps", type=int, default=5, help="Timed passes over the corpus per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes before timing")
+    parser.add_argument("--save", default=None, help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed relative regression against --compare (default: 0.10)")
+    args = parser.parse_args()
+
+    cases = CASES
+    if args.agents:
+        agents = args.agents.split(",")
+        cases = [c for c in cases if c[0] in agents]
+    if args.sizes:
+        sizes = [parse_board_size(s) for s in args.sizes.split(",")]
+        cases = [c for c in cases if c[1] in sizes]
+
+    corpus = {}
+    for name, category, k, board in CORPUS:
+        state = parse_position(board, k)
+        corpus.setdefault((state.geom.rows, state.geom.cols), []).append(state)
+
+    results = {}
+    print(f"{'case':42s} {'nodes/sec':>20s} {'ms/move':>18s} {'nodes/move':>11s}")
+    for agent_name, size, depth in cases:
+        key = case_key(agent_name, size, depth)
+        res = run_case(agent_name, corpus[size], depth, args.reps, args.warmup)
+        results[key] = res
+        print(f"{key:42s} {res['nodes_per_sec']:11.0f} ± {res['nodes_per_sec_ci']:6.0f} "
+              f"{res['ms_per_move']:9.3f} ± {res['ms_per_move_ci']:6.3f} "
+              f"{res['nodes_per_move']:11.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "cases": results}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["cases"]
+        failures = compare(results, baseline, args.threshold)
+        if failures:
+            print("\nREGRESSIONS:")
+            for line in failures:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare} (threshold {100 * args.threshold:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# check_evaluation.py
+#
+# Consistency check of the fast evaluation paths against
+# betterEvaluationFunction, on positions from random games:
+#   - IncrementalEvaluator, move by move and through take-backs;
+#   - evaluate_batch and evaluate_children (when NumPy is installed).
+# Exits with status 1 at the first position where they disagree. Also checks
+# that a timed hybrid AlphaBetaAgent (time_ms with endgame and extend) keeps
+# to its time budget, since the exact endgame solve runs inside the search.
+#
+# Usage:
+#   python check_evaluation.py
+#   python check_evaluation.py --games 1000 --seed 3
+
+import argparse
+import random
+import sys
+
+from agent_base import timed_get_action
+from alphabeta_agent import AlphaBetaAgent
+from game import GameState
+from evaluation import (betterEvaluationFunction, IncrementalEvaluator, evaluate_batch,
+                        evaluate_children, encode_states, np)
+
+INCREMENTAL_BOARDS = [(3, 3, 3), (4, 4, 3), (5, 5, 4), (4, 6, 4)]
+BATCH_BOARDS = INCREMENTAL_BOARDS + [(9, 9, 5)]
+# (rows, cols, k, time_ms, endgame): big enough that a full solve takes seconds
+TIMED_BOARDS = [(4, 4, 4, 20, 12)]
+# allowed overrun of a timed move: the last node in progress and the move
+# bookkeeping, not another search
+TIME_SLACK_MS = 100
+
+
+class Overrun(Exception):
+    """A timed search ran well past its time budget."""
+
+
+class Mismatch(Exception):
+    """A fast evaluation disagrees with betterEvaluationFunction."""
+
+
+def expect(value, expected, what, state):
+    if value != expected:
+        raise Mismatch(f"{what}: {value} instead of {expected} on\n{state}")
+
+
+def random_game(rng, rows, cols, k):
+    """Positions of one random game, from the empty board to the end."""
+    state = GameState(rows=rows, cols=cols, k=k)
+    states = [state.copy()]
+    while not state.is_terminal():
+        state.make_move(rng.choice(state.get_legal_actions()))
+        states.append(state.copy())
+    return states
+
+
+def check_incremental(rng, games):
+    """IncrementalEvaluator along random games and back; returns positions checked."""
+    checked = 0
+    for rows, cols, k in INCREMENTAL_BOARDS:
+        for _ in range(games):
+            state = GameState(rows=rows, cols=cols, k=k)
+            ev = IncrementalEvaluator(state)
+            played = []
+            while not state.is_terminal():
+                a = rng.choice(state.get_legal_actions())
+                mover = state.to_move
+                state.make_move(a)
+                ev.apply(a, mover)
+                played.append((a, mover))
+                expect(ev.value(state), betterEvaluationFunction(state), "IncrementalEvaluator", state)
+                checked += 1
+            while played:
+                a, mover = played.pop()
+                state.undo_move(a)
+                ev.revert(a, mover)
+                expect(ev.value(state), betterEvaluationFunction(state), "IncrementalEvaluator", state)
+                checked += 1
+    return checked
+
+
+def check_batch(rng, games):
+    """evaluate_batch and evaluate_children on random games; returns positions checked."""
+    checked = 0
+    for rows, cols, k in BATCH_BOARDS:
+        states = []
+        for _ in range(games):
+            states.extend(random_game(rng, rows, cols, k))
+        scores = evaluate_batch(encode_states(states), states[0].geom)
+        for state, score in zip(states, scores):
+            expect(score, betterEvaluationFunction(state), "evaluate_batch", state)
+            if not state.is_terminal():
+                actions = state.get_legal_actions()
+                expected = [betterEvaluationFunction(state.generate_successor(a)) for a in actions]
+                expect(evaluate_children(state, actions), expected, "evaluate_children", state)
+                expect(evaluate_children(state, actions, IncrementalEvaluator(state)), expected,
+                       "evaluate_children with an evaluator", state)
+        checked += len(states)
+    return checked
+
+
+def check_time_budget(rng, games):
+    """Timed hybrid AlphaBetaAgent moves on random openings; returns moves checked."""
+    checked = 0
+    for rows, cols, k, time_ms, endgame in TIMED_BOARDS:
+        agent = AlphaBetaAgent(time_ms=time_ms, endgame=endgame, extend=True)
+        for _ in range(games):
+            state = GameState(rows=rows, cols=cols, k=k)
+            # a couple of random moves, so the games differ
+            for _ in range(2):
+                state.make_move(rng.choice(state.get_legal_actions()))
+            while not state.is_terminal():
+                action, ms = timed_get_action(agent, state)
+                if ms > time_ms + TIME_SLACK_MS:
+                    raise Overrun(f"{ms:.0f} ms for a {time_ms} ms budget on\n{state}")
+                state.make_move(action)
+                checked += 1
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the fast evaluations against betterEvaluationFunction.")
+    parser.add_argument("--games", type=int, default=200, help="Random games per board")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    try:
+        checked = check_incremental(rng, args.games)
+        print(f"IncrementalEvaluator matches betterEvaluationFunction on {checked} positions")
+        if np is None:
+            print("NumPy not installed, evaluate_batch not checked")
+        else:
+            checked = check_batch(rng, args.games)
+            print(f"evaluate_batch matches betterEvaluationFunction on {checked} positions")
+        # whole games of timed moves: a few are enough
+        checked = check_time_budget(rng, max(1, args.games // 100))
+        print(f"Timed hybrid AlphaBetaAgent kept to its budget on {checked} moves")
+    except Mismatch as e:
+        print(f"MISMATCH {e}")
+        sys.exit(1)
+    except Overrun as e:
+        print(f"OVERRUN {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# endgame.py
+#
+# Helpers for the hybrid search mode of the agents (endgame=N, extend=True):
+# depth-limited search that stops guessing near the end of the game.
+#
+#   EndgameSolver   exact minimax values of positions with few empty cells,
+#                   cached, used instead of the heuristic once a position at
+#                   the search horizon has at most N empty cells
+#   forced_move     positions at the search horizon where the side to move
+#                   wins at once or faces a threat: decided exactly, or
+#                   searched one ply further along the only move that does
+#                   not lose (the block) instead of being scored by the
+#                   heuristic
+#
+# Exact values are utilities (+1 / 0 / -1). In hybrid mode the heuristic is
+# divided by heuristic_bound(geom), which keeps it strictly inside (-1, 1),
+# so a solved win always ranks above any heuristic guess.
+
+import time
+
+from agent_base import SearchTimeout
+from game import GameState
+
+# solved positions kept per board before the cache is cleared
+_CACHE_SIZE = 1000000
+
+
+def winning_cells(state: GameState, player):
+    """Mask of the empty cells where player would complete a line."""
+    geom = state.geom
+    own, other = (state.x_mask, state.o_mask) if player == 'X' else (state.o_mask, state.x_mask)
+    need = geom.k - 1
+    cells = 0
+    for m in geom.line_masks:
+        if not other & m and (own & m).bit_count() == need:
+            cells |= m & ~own
+    return cells
+
+
+def forced_move(state: GameState):
+    """
+    For a position that is not over, under best play by both sides:
+    (value, None) if the side to move wins at once, or loses because the
+    opponent threatens to win on two cells (value for X); (None, cell) if
+    the side to move must block the opponent's one threat at cell; and
+    (None, None) otherwise.
+    """
+    player = state.to_move
+    if winning_cells(state, player):
+        return (1 if player == 'X' else -1), None
+    threats = winning_cells(state, 'O' if player == 'X' else 'X')
+    if not threats:
+        return None, None
+    if threats & (threats - 1):
+        return (-1 if player == 'X' else 1), None
+    return None, threats.bit_length() - 1
+
+
+class EndgameSolver:
+    """
+    Exact minimax values (X's point of view) by exhaustive search, cached
+    per position. Meant for positions with few empty cells; a node stops as
+    soon as one move wins, which is exact because nothing beats a win.
+    """
+
+    def __init__(self, max_size=_CACHE_SIZE):
+        self.max_size = max_size
+        self._caches = {}
+
+    def solve(self, state: GameState, stats=None, ply=0, deadline=None):
+        """
+        Exact value of state for X. stats (if given) counts the nodes below
+        state, which the caller has already counted itself at ply. Raises
+        SearchTimeout once time.perf_counter() passes deadline (if given);
+        the positions solved until then stay cached.
+        """
+        cache = self._caches.get(state.geom)
+        if cache is None:
+            cache = self._caches[state.geom] = {}
+        elif len(cache) >= self.max_size:
+            cache.clear()
+        value = self._solve(state.copy(), cache, stats, ply, deadline, True)
+        return value if state.to_move == 'X' else -value
+
+    def _solve(self, state, cache, stats, ply, deadline, counted=False):
+        # value for the side to move
+        key = state.key()
+        value = cache.get(key)
+        if value is not None:
+            if stats is not None:
+                stats.tt_hits += 1
+            return value
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout()
+        if stats is not None and not counted:
+            stats.enter(ply)
+        if state.is_terminal():
+            if stats is not None:
+                stats.terminals += 1
+            # the game ended on the opponent's move: a loss or a draw
+            value = -abs(state.utility())
+        else:
+            if stats is not None:
+                stats.expand(ply)
+            value = -1
+            for a in state.get_legal_actions():
+                state.make_move(a)
+                v = -self._solve(state, cache, stats, ply + 1, deadline)
+                state.undo_move(a)
+                if v > value:
+                    value = v
+                    if value == 1:
+                        break
+        cache[key] = value
+        return value
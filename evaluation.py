@@ -1,45 +1,240 @@
 # evaluation.py
 
+from functools import lru_cache
+
 from game import GameState
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def betterEvaluationFunction(state: GameState):
     """
     Heuristic for non-terminal Tic-Tac-Toe states.
     Score from the perspective of X (MAX).
+    The features come from the board geometry: the center cell(s), the four
+    corners and every line of k cells. On 3x3 that is cell 4, cells
+    0/2/6/8 and the 8 winning lines.
     """
     # If terminal, just return utility
     if state.is_terminal():
         return state.utility()
 
     score = 0
+    geom = state.geom
+    x, o = state.x_mask, state.o_mask
 
     # Feature: center control
-    center = 4
-    if state.board[center] == 'X':
-        score += 1
-    elif state.board[center] == 'O':
-        score -= 1
+    score += (x & geom.center_mask).bit_count() - (o & geom.center_mask).bit_count()
 
     # Feature: corners
-    corners = [0, 2, 6, 8]
-    for c in corners:
-        if state.board[c] == 'X':
-            score += 0.5
-        elif state.board[c] == 'O':
-            score -= 0.5
-
-    # Feature: open lines (three in a row not blocked)
-    lines = [
-        (0,1,2), (3,4,5), (6,7,8),
-        (0,3,6), (1,4,7), (2,5,8),
-        (0,4,8), (2,4,6)
-    ]
-    for (i,j,k) in lines:
-        line = [state.board[i], state.board[j], state.board[k]]
-        if 'X' in line and 'O' not in line:
-            # only X present
-            score += 3
-        elif 'O' in line and 'X' not in line:
+    score += 0.5 * ((x & geom.corner_mask).bit_count() - (o & geom.corner_mask).bit_count())
+
+    # Feature: open lines (k in a row not blocked)
+    for m in geom.line_masks:
+        if x & m:
+            if not o & m:
+                # only X present
+                score += 3
+        elif o & m:
             score -= 3
 
-    return score
\ No newline at end of file
+    return score
+
+
+@lru_cache(maxsize=None)
+def heuristic_bound(geom):
+    """A number larger than |betterEvaluationFunction| on any board of geom."""
+    return (geom.center_mask.bit_count() + 0.5 * geom.corner_mask.bit_count()
+            + 3 * len(geom.line_masks) + 1)
+
+
+class IncrementalEvaluator:
+    """
+    betterEvaluationFunction kept up to date move by move.
+    Holds the X and O counts of every line and the running score; the search
+    calls apply() after make_move and revert() after undo_move, which only
+    touch the lines through the played cell.
+    """
+
+    def __init__(self, state: GameState):
+        geom = state.geom
+        self.geom = geom
+        x, o = state.x_mask, state.o_mask
+        self.x_counts = [(x & m).bit_count() for m in geom.line_masks]
+        self.o_counts = [(o & m).bit_count() for m in geom.line_masks]
+        score = (x & geom.center_mask).bit_count() - (o & geom.center_mask).bit_count()
+        score += 0.5 * ((x & geom.corner_mask).bit_count() - (o & geom.corner_mask).bit_count())
+        for xc, oc in zip(self.x_counts, self.o_counts):
+            score += _line_score(xc, oc)
+        self.score = score
+
+    def value(self, state: GameState):
+        """Same result as betterEvaluationFunction(state)."""
+        if state.is_terminal():
+            return state.utility()
+        return self.score
+
+    def apply(self, action, player):
+        """player ('X' or 'O') has just played action."""
+        self._update(action, player, 1)
+
+    def revert(self, action, player):
+        """player's move at action has just been taken back."""
+        self._update(action, player, -1)
+
+    def _update(self, action, player, step):
+        geom = self.geom
+        bit = 1 << action
+        sign = step if player == 'X' else -step
+        delta = 0
+        if geom.center_mask & bit:
+            delta += sign
+        if geom.corner_mask & bit:
+            delta += 0.5 * sign
+        xs, os = self.x_counts, self.o_counts
+        for j in geom.line_ids_through[action]:
+            xc, oc = xs[j], os[j]
+            before = _line_score(xc, oc)
+            if player == 'X':
+                xc = xs[j] = xc + step
+            else:
+                oc = os[j] = oc + step
+            delta += _line_score(xc, oc) - before
+        self.score += delta
+
+
+def _line_score(x_count, o_count):
+    if x_count:
+        return 0 if o_count else 3
+    return -3 if o_count else 0
+
+
+# ---------------------------------------------------------------
+# Batch evaluation (needs NumPy)
+#
+# Boards are rows of an (N, cells) int8 array: 1 for X, -1 for O and 0 for
+# an empty cell, in the cell order of GameState.
+# ---------------------------------------------------------------
+_batch_tables = {}
+
+
+def _geometry_arrays(geom):
+    # line cell indices (lines, k), center cells, corner cells, the
+    # cell x line incidence matrix and the center/corner bonus per cell
+    arrays = _batch_tables.get(geom)
+    if arrays is None:
+        incidence = np.zeros((geom.cells, len(geom.lines)))
+        for j, line in enumerate(geom.lines):
+            incidence[list(line), j] = 1
+        bonus = np.array([((geom.center_mask >> c) & 1) + 0.5 * ((geom.corner_mask >> c) & 1)
+                          for c in range(geom.cells)])
+        arrays = _batch_tables[geom] = (
+            np.array(geom.lines, dtype=np.intp),
+            np.array([c for c in range(geom.cells) if (geom.center_mask >> c) & 1], dtype=np.intp),
+            np.array([c for c in range(geom.cells) if (geom.corner_mask >> c) & 1], dtype=np.intp),
+            incidence,
+            bonus,
+        )
+    return arrays
+
+
+def encode_states(states, geom=None):
+    """(N, cells) int8 board array of a sequence of GameStates of one geometry."""
+    if np is None:
+        raise ImportError("encode_states needs NumPy")
+    states = list(states)
+    if geom is None:
+        geom = states[0].geom if states else GameState().geom
+    boards = np.zeros((len(states), geom.cells), dtype=np.int8)
+    if geom.cells <= 64:
+        # unpack the bitboards of all states at once
+        shifts = np.arange(geom.cells, dtype=np.uint64)
+        x = np.array([s.x_mask for s in states], dtype=np.uint64).reshape(-1, 1)
+        o = np.array([s.o_mask for s in states], dtype=np.uint64).reshape(-1, 1)
+        boards += ((x >> shifts) & 1).astype(np.int8)
+        boards -= ((o >> shifts) & 1).astype(np.int8)
+    else:
+        for i, s in enumerate(states):
+            for c in range(geom.cells):
+                if (s.x_mask >> c) & 1:
+                    boards[i, c] = 1
+                elif (s.o_mask >> c) & 1:
+                    boards[i, c] = -1
+    return boards
+
+
+def evaluate_batch(boards, geom=None):
+    """
+    betterEvaluationFunction for every row of an (N, cells) board array,
+    as a float array of N scores. Finished games score their utility.
+    """
+    if np is None:
+        raise ImportError("evaluate_batch needs NumPy")
+    if geom is None:
+        geom = GameState().geom
+    boards = np.asarray(boards, dtype=np.int8).reshape(-1, geom.cells)
+    lines, center, corners, _, _ = _geometry_arrays(geom)
+    on_lines = boards[:, lines]                       # (N, lines, k)
+    x_counts = (on_lines == 1).sum(axis=2)
+    o_counts = (on_lines == -1).sum(axis=2)
+
+    score = boards[:, center].sum(axis=1, dtype=np.float64)
+    score += 0.5 * boards[:, corners].sum(axis=1, dtype=np.float64)
+    score += 3.0 * ((x_counts > 0) & (o_counts == 0)).sum(axis=1)
+    score -= 3.0 * ((o_counts > 0) & (x_counts == 0)).sum(axis=1)
+
+    # the first complete line decides the winner, as in GameState
+    n_lines = lines.shape[0]
+    x_full = x_counts == geom.k
+    o_full = o_counts == geom.k
+    x_first = np.where(x_full.any(axis=1), x_full.argmax(axis=1), n_lines)
+    o_first = np.where(o_full.any(axis=1), o_full.argmax(axis=1), n_lines)
+    board_full = (boards != 0).all(axis=1)
+    score = np.where(board_full, 0.0, score)
+    score = np.where(o_first < x_first, -1.0, score)
+    score = np.where(x_first < o_first, 1.0, score)
+    return score
+
+
+def evaluate_children(state: GameState, actions, evaluator=None):
+    """
+    Scores of the positions after each of actions from the non-terminal
+    state, as a list: betterEvaluationFunction of every child, computed for
+    all children in one call from the parent's line counts (taken from
+    evaluator, an IncrementalEvaluator of state, if given). Without NumPy
+    the children are scored one at a time.
+    """
+    if np is None:
+        scores = []
+        for a in actions:
+            state.make_move(a)
+            scores.append(betterEvaluationFunction(state))
+            state.undo_move(a)
+        return scores
+    geom = state.geom
+    _, _, _, incidence, bonus = _geometry_arrays(geom)
+    if evaluator is not None:
+        base = evaluator.score
+        xc = np.array(evaluator.x_counts)
+        oc = np.array(evaluator.o_counts)
+    else:
+        base = betterEvaluationFunction(state)
+        xc = np.array([(state.x_mask & m).bit_count() for m in geom.line_masks])
+        oc = np.array([(state.o_mask & m).bit_count() for m in geom.line_masks])
+    before = np.where(xc > 0, np.where(oc > 0, 0, 3), np.where(oc > 0, -3, 0))
+    if state.to_move == 'X':
+        after = np.where(oc > 0, 0, 3)
+        wins = (xc == geom.k - 1) & (oc == 0)
+        sign = 1
+    else:
+        after = np.where(xc > 0, 0, -3)
+        wins = (oc == geom.k - 1) & (xc == 0)
+        sign = -1
+    # a move changes the score of the lines through its cell only
+    scores = base + sign * bonus + incidence @ (after - before)
+    if state.empty_count() == 1:
+        scores[:] = 0.0
+    scores = np.where(incidence @ wins > 0, float(sign), scores)
+    return scores[actions].tolist()
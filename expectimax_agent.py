@@ -1,15 +1,66 @@
 # expectimax_agent.py
 from agent_base import Agent
 from game import GameState
-from evaluation import betterEvaluationFunction
+from evaluation import betterEvaluationFunction, IncrementalEvaluator, heuristic_bound
+from endgame import winning_cells
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from symmetry import unique_actions
+from parallel import parallel_expectimax
+from opponent_model import SoftmaxPolicy, make_policy
+
+# every game result lies in [UTILITY_MIN, UTILITY_MAX], which is what lets
+# full-depth chance nodes be pruned (heuristic values are not bounded)
+UTILITY_MIN = -1
+UTILITY_MAX = 1
+
 
 class ExpectimaxAgent(Agent):
+    # chance-node values, not minimax ones
+    TT_SPACE = 1
+
+    def __init__(self, tt=None, symmetry=False, workers=None, incremental_eval=True,
+                 memo=False, prune=False, policy="uniform", temperature=1.0,
+                 endgame=None, extend=False):
+        # memo: cache values by (position, remaining depth) in a private
+        # table when no shared one is given; endgame solves need one too
+        if (memo or endgame is not None) and tt is None:
+            tt = TranspositionTable()
+        super().__init__(tt=tt, symmetry=symmetry)
+        # with workers > 1 the root moves are searched in a process pool
+        self.workers = workers
+        # depth-limited searches update the evaluation move by move
+        self.incremental_eval = incremental_eval
+        self._evaluator = None
+        # Star1 pruning of chance nodes, used by full-depth searches only
+        self.prune = prune
+        # how O is assumed to pick moves: "uniform", "softmax" (with
+        # temperature) or a callable, see opponent_model.py
+        self.policy = make_policy(policy, temperature)
+        # hybrid mode, as for AlphaBetaAgent, except that the exact endgame
+        # value is the expectimax one: the search simply goes on to the end
+        # of the game below the depth limit once few cells are empty
+        self.endgame = endgame
+        self.extend = extend
+        self.hybrid = endgame is not None or extend
+
     def get_action(self, state: GameState, depth=None):
         """
-        Returns the best move index (0-8) using Expectimax search.
+        Returns the best move index (0-8 on 3x3) using Expectimax search.
         Handles stochastic (non-optimal) opponent moves.
         """
-        value, action = self.expectimax(state, depth_limit=depth, current_depth=0)
+        if (self.workers and self.workers > 1 and state.to_move == 'X'
+                and not state.is_terminal() and depth != 0):
+            root = state.copy()
+            self.last_value, action = parallel_expectimax(self, root, self.legal_actions(root), depth)
+        else:
+            # search on a private copy, moves are made and undone in place
+            root = state.copy()
+            if depth is not None and self.incremental_eval:
+                self._evaluator = IncrementalEvaluator(root)
+            try:
+                self.last_value, action = self.expectimax(root, depth_limit=depth, current_depth=0)
+            finally:
+                self._evaluator = None
         # Safety fallback in case no action is found
         if action is None:
             legal = state.get_legal_actions()
@@ -17,35 +68,170 @@ class ExpectimaxAgent(Agent):
                 action = legal[0]
         return action
 
-    def expectimax(self, state: GameState, depth_limit, current_depth):
+    def worker_copy(self):
+        """Agent with the same settings and an empty table, for parallel search workers."""
+        tt = TranspositionTable(self.tt.max_size, self.tt.policy) if self.tt is not None else None
+        agent = ExpectimaxAgent(tt=tt, symmetry=self.symmetry, incremental_eval=self.incremental_eval,
+                                prune=self.prune, policy=self.policy or "uniform",
+                                endgame=self.endgame, extend=self.extend)
+        if self.stats is not None:
+            agent.enable_stats()
+        return agent
+
+    def tt_space(self):
+        # chance-node values also depend on how O is assumed to play (None
+        # for uniform); other callables only match themselves
+        return super().tt_space() + (self.policy,)
+
+    def chance_moves(self, state: GameState):
+        """(action, weight) pairs of O's moves under self.policy."""
+        policy = self.policy
+        if self.symmetry and (policy is None or isinstance(policy, SoftmaxPolicy)):
+            # each kept move stands for `count` moves with the same weight
+            weighted = unique_actions(state)
+            if policy is not None:
+                weights = policy(state, [a for a, _ in weighted])
+                weighted = [(a, count * w) for (a, count), w in zip(weighted, weights)]
+            return weighted
+        actions = state.get_legal_actions()
+        if policy is None:
+            return [(a, 1) for a in actions]
+        return list(zip(actions, policy(state, actions)))
+
+    def expectimax(self, state: GameState, depth_limit, current_depth,
+                   alpha=float('-inf'), beta=float('inf')):
         """
-        Recursive Expectimax returning (value, best_action)
+        Recursive Expectimax returning (value, best_action).
+        With pruning, alpha and beta are a window as in alpha-beta: a value
+        outside it is only a bound on the true value.
         """
+        stats = self.stats
+        if stats is not None:
+            stats.enter(current_depth)
         # Terminal check
         if state.is_terminal():
+            if stats is not None:
+                stats.terminals += 1
             return state.utility(), None
         # Cutoff check
+        evaluator = self._evaluator
         if depth_limit is not None and current_depth >= depth_limit:
-            return betterEvaluationFunction(state), None
+            if self.endgame is not None and state.empty_count() <= self.endgame:
+                depth_limit = None
+            elif self.extend and state.to_move == 'X' and winning_cells(state, 'X'):
+                # X takes an immediate win; blocks are not forced against a
+                # chance player, so that is the only forcing case here
+                if stats is not None:
+                    stats.evals += 1
+                return UTILITY_MAX, None
+            else:
+                if stats is not None:
+                    stats.evals += 1
+                if evaluator is not None:
+                    value = evaluator.value(state)
+                else:
+                    value = betterEvaluationFunction(state)
+                if self.hybrid:
+                    value /= heuristic_bound(state.geom)
+                return value, None
+        # Cached value for this position at this remaining depth
+        tt = self.tt
+        if tt is not None:
+            key, sym = self.tt_key(state)
+            remaining = state.empty_count()
+            if depth_limit is not None:
+                remaining = min(remaining, depth_limit - current_depth)
+            entry = self.tt_probe(key, sym)
+            if entry is not None:
+                val, act, entry_depth, flag = entry
+                if entry_depth == remaining and (
+                        flag == EXACT or (flag == LOWER and val >= beta)
+                        or (flag == UPPER and val <= alpha)):
+                    if stats is not None:
+                        stats.tt_hits += 1
+                    return val, act
+            alpha0, beta0 = alpha, beta
+        if stats is not None:
+            stats.expand(current_depth)
+        prune = self.prune and depth_limit is None
         # MAX node (X)
         if state.to_move == 'X':
             best_val = float('-inf')
             best_act = None
-            for a in state.get_legal_actions():
-                succ = state.generate_successor(a)
-                val, _ = self.expectimax(succ, depth_limit, current_depth + 1)
+            for a in self.legal_actions(state):
+                state.make_move(a)
+                if evaluator is not None:
+                    evaluator.apply(a, 'X')
+                val, _ = self.expectimax(state, depth_limit, current_depth + 1, alpha, beta)
+                state.undo_move(a)
+                if evaluator is not None:
+                    evaluator.revert(a, 'X')
                 if val > best_val:
                     best_val, best_act = val, a
-            return best_val, best_act
+                if prune:
+                    alpha = max(alpha, best_val)
+                    if best_val >= beta:
+                        if stats is not None:
+                            stats.cutoffs += 1
+                        break
 
-        # CHANCE node (O): average the outcomes
+        # CHANCE node (O): weighted average of the outcomes
         else:
-            actions = state.get_legal_actions()
-            if not actions:
+            weighted = self.chance_moves(state)
+            if not weighted:
                 return 0, None
+            n = sum(w for _, w in weighted)
             total = 0
-            for a in actions:
-                succ = state.generate_successor(a)
-                val, _ = self.expectimax(succ, depth_limit, current_depth + 1)
-                total += val
-            return total / len(actions), None
+            rest = n
+            best_act = None
+            for a, w in weighted:
+                rest -= w
+                lo, hi = float('-inf'), float('inf')
+                if prune:
+                    # Star1: the window this child must hit for the average
+                    # to land inside (alpha, beta), assuming the unsearched
+                    # children are all as good or all as bad as possible
+                    lo = max((alpha * n - total - rest * UTILITY_MAX) / w, UTILITY_MIN)
+                    hi = min((beta * n - total - rest * UTILITY_MIN) / w, UTILITY_MAX)
+                    if lo >= UTILITY_MAX or hi <= UTILITY_MIN:
+                        best_val = self._chance_bound(total, rest + w, n, alpha, beta,
+                                                      lo >= UTILITY_MAX)
+                        if stats is not None:
+                            stats.cutoffs += 1
+                        break
+                state.make_move(a)
+                if evaluator is not None:
+                    evaluator.apply(a, 'O')
+                val, _ = self.expectimax(state, depth_limit, current_depth + 1, lo, hi)
+                state.undo_move(a)
+                if evaluator is not None:
+                    evaluator.revert(a, 'O')
+                total += w * val
+                # a child outside its window is only a bound, and so is the node
+                if prune and ((val <= lo and lo > UTILITY_MIN) or (val >= hi and hi < UTILITY_MAX)):
+                    best_val = self._chance_bound(total, rest, n, alpha, beta, val <= lo)
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    break
+            else:
+                best_val = total / n
+
+        if tt is not None:
+            if best_val <= alpha0:
+                flag = UPPER
+            elif best_val >= beta0:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt_store(key, sym, best_val, best_act, remaining, flag)
+        return best_val, best_act
+
+    @staticmethod
+    def _chance_bound(total, rest, n, alpha, beta, fail_low):
+        """
+        Bound returned by a pruned chance node: the best (fail low) or worst
+        (fail high) average the unsearched weight rest could still give.
+        """
+        if fail_low:
+            return min((total + rest * UTILITY_MAX) / n, alpha)
+        return max((total + rest * UTILITY_MIN) / n, beta)
@@ -1,44 +1,210 @@
 # game.py
 
-class GameState:
+from functools import lru_cache
+
+
+class BoardGeometry:
     """
-    Represents a Tic-Tac-Toe board.
-    Board is a list of length 9, indices 0..8.
-    'X' for MAX, 'O' for MIN, or None for empty.
+    Precomputed tables for a rows x cols board where k in a row wins.
+    Cell i (row-major) of the board is bit (1 << i) in a player's mask.
+    Shared by every GameState of the same shape, get one with get_geometry().
     """
 
-    def __init__(self, board=None, to_move='X'):
-        if board is None:
-            self.board = [None] * 9
+    def __init__(self, rows, cols, k):
+        if rows < 1 or cols < 1 or not 1 <= k <= max(rows, cols):
+            raise ValueError(f"Invalid board {rows}x{cols} with k={k}")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full_mask = (1 << self.cells) - 1
+
+        # every run of k cells along a row, column, diagonal or anti-diagonal,
+        # in that order (for 3x3 the classic 8 lines in the usual order)
+        lines = []
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for r in range(rows):
+                for c in range(cols):
+                    end_r, end_c = r + dr * (k - 1), c + dc * (k - 1)
+                    if 0 <= end_r < rows and 0 <= end_c < cols:
+                        line = tuple((r + dr * i) * cols + (c + dc * i) for i in range(k))
+                        if line not in lines:
+                            lines.append(line)
+        self.lines = tuple(lines)
+        self.line_masks = tuple(sum(1 << i for i in line) for line in self.lines)
+        # masks of the lines through each cell, the only ones a move there can complete
+        self.lines_through = tuple(
+            tuple(m for m in self.line_masks if (m >> i) & 1) for i in range(self.cells)
+        )
+        self.line_ids_through = tuple(
+            tuple(j for j, m in enumerate(self.line_masks) if (m >> i) & 1) for i in range(self.cells)
+        )
+
+        mid_rows = {(rows - 1) // 2, rows // 2}
+        mid_cols = {(cols - 1) // 2, cols // 2}
+        self.center_cells = tuple(sorted(r * cols + c for r in mid_rows for c in mid_cols))
+        self.corner_cells = tuple(sorted({0, cols - 1, (rows - 1) * cols, self.cells - 1}))
+        self.center_mask = sum(1 << i for i in self.center_cells)
+        self.corner_mask = sum(1 << i for i in self.corner_cells)
+
+        # legal action lists for every occupied mask on small boards, so
+        # get_legal_actions is a single tuple lookup
+        if self.cells <= 12:
+            self.legal_actions = tuple(
+                tuple(i for i in range(self.cells) if not (occ >> i) & 1)
+                for occ in range(self.full_mask + 1)
+            )
         else:
-            self.board = board[:]
+            self.legal_actions = None
+
+    def __reduce__(self):
+        # pickles as its shape, so worker processes rebuild (and cache) the tables
+        return get_geometry, (self.rows, self.cols, self.k)
+
+    def __repr__(self):
+        return f"BoardGeometry({self.rows}, {self.cols}, {self.k})"
+
+
+@lru_cache(maxsize=None)
+def get_geometry(rows=3, cols=3, k=3):
+    return BoardGeometry(rows, cols, k)
+
+
+def parse_board_size(text):
+    """'4' -> (4, 4), '4x5' -> (4, 5); used by the --size options."""
+    rows, _, cols = text.lower().partition("x")
+    rows = int(rows)
+    return rows, int(cols) if cols else rows
+
+
+DEFAULT_GEOMETRY = get_geometry(3, 3, 3)
+
+# 3x3 tables, for code that only handles the classic board
+FULL_MASK = DEFAULT_GEOMETRY.full_mask
+WIN_LINES = DEFAULT_GEOMETRY.lines
+WIN_MASKS = DEFAULT_GEOMETRY.line_masks
+
+
+class GameState:
+    """
+    Represents an m x n, k-in-a-row board (3x3 with k=3, Tic-Tac-Toe, by
+    default). The board is stored as two bit masks (x_mask, o_mask), cells
+    indexed row by row from 0. 'X' for MAX, 'O' for MIN. state.board still
+    gives the old list view ('X', 'O' or None per cell).
+    The winner is tracked incrementally: a move only checks the lines
+    through its own cell.
+    """
+
+    __slots__ = ("x_mask", "o_mask", "to_move", "geom", "win")
+
+    def __init__(self, board=None, to_move='X', rows=3, cols=3, k=3):
+        self.geom = get_geometry(rows, cols, k)
+        self.x_mask = 0
+        self.o_mask = 0
+        if board is not None:
+            if len(board) != self.geom.cells:
+                raise ValueError(f"Board has {len(board)} cells, expected {self.geom.cells}")
+            for i, v in enumerate(board):
+                if v == 'X':
+                    self.x_mask |= 1 << i
+                elif v == 'O':
+                    self.o_mask |= 1 << i
         self.to_move = to_move  # 'X' or 'O'
+        self.win = self._scan_winner()
+
+    @property
+    def board(self):
+        x, o = self.x_mask, self.o_mask
+        return ['X' if (x >> i) & 1 else 'O' if (o >> i) & 1 else None
+                for i in range(self.geom.cells)]
+
+    def copy(self):
+        s = GameState.__new__(GameState)
+        s.x_mask = self.x_mask
+        s.o_mask = self.o_mask
+        s.to_move = self.to_move
+        s.geom = self.geom
+        s.win = self.win
+        return s
+
+    def key(self):
+        """Integer hash of the position: both masks plus the side to move."""
+        cells = self.geom.cells
+        return self.x_mask | (self.o_mask << cells) | ((self.to_move == 'O') << (2 * cells))
+
+    @classmethod
+    def from_key(cls, key, rows=3, cols=3, k=3):
+        """Inverse of key()."""
+        s = cls.__new__(cls)
+        s.geom = geom = get_geometry(rows, cols, k)
+        s.x_mask = key & geom.full_mask
+        s.o_mask = (key >> geom.cells) & geom.full_mask
+        s.to_move = 'O' if (key >> (2 * geom.cells)) & 1 else 'X'
+        s.win = s._scan_winner()
+        return s
+
+    def empty_count(self):
+        return self.geom.cells - (self.x_mask | self.o_mask).bit_count()
 
     def get_legal_actions(self):
-        return [i for i, v in enumerate(self.board) if v is None]
+        occ = self.x_mask | self.o_mask
+        table = self.geom.legal_actions
+        if table is not None:
+            return list(table[occ])
+        return [i for i in range(self.geom.cells) if not (occ >> i) & 1]
 
     def generate_successor(self, action):
-        newb = self.board[:]
-        newb[action] = self.to_move
-        next_to = 'O' if self.to_move == 'X' else 'X'
-        return GameState(newb, next_to)
+        s = self.copy()
+        s.make_move(action)
+        return s
+
+    def make_move(self, action):
+        """Play action for the side to move, in place."""
+        bit = 1 << action
+        if self.to_move == 'X':
+            mask = self.x_mask = self.x_mask | bit
+            self.to_move = 'O'
+            mover = 'X'
+        else:
+            mask = self.o_mask = self.o_mask | bit
+            self.to_move = 'X'
+            mover = 'O'
+        for m in self.geom.lines_through[action]:
+            if mask & m == m:
+                self.win = mover
+                break
+
+    def undo_move(self, action):
+        """
+        Take back action, which must be the last move made with make_move.
+        Searches never move from a finished game, so the position before
+        the move had no winner.
+        """
+        if self.to_move == 'X':
+            self.o_mask &= ~(1 << action)
+            self.to_move = 'O'
+        else:
+            self.x_mask &= ~(1 << action)
+            self.to_move = 'X'
+        self.win = None
 
     def is_terminal(self):
-        return (self.winner() is not None) or (all(v is not None for v in self.board))
+        return self.win is not None or (self.x_mask | self.o_mask) == self.geom.full_mask
 
     def winner(self):
-        wins = [
-            (0,1,2), (3,4,5), (6,7,8),
-            (0,3,6), (1,4,7), (2,5,8),
-            (0,4,8), (2,4,6)
-        ]
-        for (i,j,k) in wins:
-            if self.board[i] is not None and self.board[i] == self.board[j] == self.board[k]:
-                return self.board[i]
+        return self.win
+
+    def _scan_winner(self):
+        x, o = self.x_mask, self.o_mask
+        for m in self.geom.line_masks:
+            if x & m == m:
+                return 'X'
+            if o & m == m:
+                return 'O'
         return None
 
     def utility(self):
-        w = self.winner()
+        w = self.win
         if w == 'X':
             return +1
         elif w == 'O':
@@ -47,11 +213,9 @@ class GameState:
             return 0
 
     def __str__(self):
+        board = self.board
+        cols = self.geom.cols
         def v(i):
-            return self.board[i] if self.board[i] is not None else ' '
-        s = ""
-        for r in range(3):
-            s += f"{v(3*r)}|{v(3*r+1)}|{v(3*r+2)}\n"
-            if r<2:
-                s += "-+-+-\n"
-        return s
+            return board[i] if board[i] is not None else ' '
+        rows = ["|".join(v(r * cols + c) for c in range(cols)) for r in range(self.geom.rows)]
+        return ("\n" + "-+" * (cols - 1) + "-\n").join(rows) + "\n"
@@ -0,0 +1,260 @@
+# mcts_agent.py
+#
+# Monte Carlo Tree Search (UCT). Instead of searching every move to a fixed
+# depth, the agent grows a tree towards the moves that have done best in
+# random playouts, so its strength grows with the number of iterations
+# (or the time budget) on any board size.
+#
+# Playouts are run in batches from each new leaf. A random playout is just
+# a random order of the empty cells, with the players taking turns, so it
+# does not have to be played move by move: a player wins with the line
+# they would complete first, at the latest time among its empty cells,
+# provided all of them fall on that player's turns. With NumPy installed a
+# whole batch is evaluated at once as an array of cell times; without it
+# the same rule is applied one playout at a time.
+
+import math
+import random
+import time
+
+from agent_base import Agent
+from game import GameState
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Node:
+    """One position of the search tree, reached by action from parent."""
+
+    __slots__ = ("parent", "action", "children", "untried", "visits", "wins")
+
+    def __init__(self, parent=None, action=None):
+        self.parent = parent
+        self.action = action
+        self.children = {}
+        # moves not yet expanded, filled in on the first visit
+        self.untried = None
+        self.visits = 0
+        # playout score of the player who made action: 1 per win, 0.5 per draw
+        self.wins = 0.0
+
+
+def _playout_lines(state):
+    """
+    Lines each player can still complete, as lists of indices into the
+    state's empty cells: (lines for the side to move, lines for the other).
+    """
+    geom = state.geom
+    index = {c: i for i, c in enumerate(state.get_legal_actions())}
+    mine, theirs = (state.x_mask, state.o_mask) if state.to_move == 'X' else (state.o_mask, state.x_mask)
+    lines_mine, lines_theirs = [], []
+    for line, m in zip(geom.lines, geom.line_masks):
+        cells = [index[c] for c in line if c in index]
+        if not theirs & m:
+            lines_mine.append(cells)
+        if not mine & m:
+            lines_theirs.append(cells)
+    return lines_mine, lines_theirs
+
+
+def _first_completion(times, lines, parity):
+    """Earliest time one of lines is complete with all its cells on turns of parity."""
+    best = None
+    for cells in lines:
+        last = -1
+        for c in cells:
+            t = times[c]
+            if t % 2 != parity:
+                break
+            if t > last:
+                last = t
+        else:
+            if best is None or last < best:
+                best = last
+    return best
+
+
+def random_playouts(state, n, rng=random, np_rng=None):
+    """
+    Plays n uniformly random games from the non-terminal state and returns
+    (wins of the side to move, wins of the other side); the rest are draws.
+    """
+    lines_mine, lines_theirs = _playout_lines(state)
+    empties = state.empty_count()
+    if np is not None and np_rng is not None:
+        return _random_playouts_numpy(empties, lines_mine, lines_theirs, n, np_rng)
+
+    order = list(range(empties))
+    wins_mine = wins_theirs = 0
+    for _ in range(n):
+        # times[c] is the turn on which empty cell c is played; the side to
+        # move plays on even turns
+        rng.shuffle(order)
+        t_mine = _first_completion(order, lines_mine, 0)
+        t_theirs = _first_completion(order, lines_theirs, 1)
+        if t_mine is not None and (t_theirs is None or t_mine < t_theirs):
+            wins_mine += 1
+        elif t_theirs is not None:
+            wins_theirs += 1
+    return wins_mine, wins_theirs
+
+
+def _line_array(lines, empties):
+    # lines padded to equal length with the extra column `empties`
+    width = max((len(cells) for cells in lines), default=0)
+    return np.array([cells + [empties] * (width - len(cells)) for cells in lines],
+                    dtype=np.intp).reshape(len(lines), width)
+
+
+def _first_completion_numpy(times, lines, parity, never):
+    if lines.shape[0] == 0:
+        return np.full(times.shape[0], never)
+    t = times[:, lines]                               # (n, lines, width)
+    # the padding column has time -1: never the latest, and any parity
+    ok = ((t % 2 == parity) | (t < 0)).all(axis=2)
+    done = np.where(ok, t.max(axis=2), never)
+    return done.min(axis=1)
+
+
+def _random_playouts_numpy(empties, lines_mine, lines_theirs, n, np_rng):
+    # one random permutation of the turns per playout, plus the padding column
+    times = np.empty((n, empties + 1), dtype=np.intp)
+    times[:, :empties] = np_rng.random((n, empties)).argsort(axis=1)
+    times[:, empties] = -1
+    never = empties + 1
+    t_mine = _first_completion_numpy(times, _line_array(lines_mine, empties), 0, never)
+    t_theirs = _first_completion_numpy(times, _line_array(lines_theirs, empties), 1, never)
+    wins_mine = int(np.count_nonzero(t_mine < t_theirs))
+    wins_theirs = int(np.count_nonzero(t_theirs < t_mine))
+    return wins_mine, wins_theirs
+
+
+class MCTSAgent(Agent):
+    """
+    UCT search. Each iteration walks down the tree by the UCB1 score,
+    expands one new move, and scores it with `batch` random playouts.
+
+    iterations  iterations per move (used when time_ms is None)
+    time_ms     per-move time budget instead of a fixed iteration count
+    c           exploration constant of UCB1
+    batch       random playouts per new leaf
+    seed        random seed, for repeatable games
+
+    The tree is kept between moves: the next search starts from the node of
+    the position actually reached, if the tree has it. The depth argument
+    of get_action is ignored.
+    """
+
+    def __init__(self, iterations=1000, time_ms=None, c=1.4, batch=16, seed=None):
+        super().__init__()
+        self.iterations = iterations
+        self.time_ms = time_ms
+        self.c = c
+        self.batch = batch
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed) if np is not None else None
+        self.root = None
+        self.root_key = None
+        self.root_geom = None
+
+    def get_action(self, state: GameState, depth=None):
+        """
+        Returns the most visited move after the search (0-8 on 3x3).
+        """
+        if state.is_terminal():
+            return None
+        root = self._find_root(state)
+        deadline = None
+        if self.time_ms is not None:
+            deadline = time.perf_counter() + self.time_ms / 1000.0
+        iterations = 0
+        # at least one iteration, so the root has a child to pick
+        while iterations == 0 or (
+                time.perf_counter() < deadline if deadline is not None
+                else iterations < self.iterations):
+            self._iterate(root, state.copy())
+            iterations += 1
+
+        child = max(root.children.values(), key=lambda n: n.visits)
+        # the chosen move's playout score, scaled to X's [-1, 1]
+        value = 2.0 * child.wins / child.visits - 1.0
+        self.last_value = value if state.to_move == 'X' else -value
+        # keep the subtree of the chosen move for the next search
+        after = state.copy()
+        after.make_move(child.action)
+        child.parent = None
+        self.root, self.root_key = child, after.key()
+        return child.action
+
+    def _find_root(self, state):
+        """Tree node for state: the kept root, one of its children, or a new node."""
+        key = state.key()
+        root = self.root
+        if root is not None and self.root_geom is state.geom:
+            if self.root_key == key:
+                return root
+            # the opponent's reply to our last move
+            previous = GameState.from_key(self.root_key, state.geom.rows, state.geom.cols, state.geom.k)
+            for action, child in root.children.items():
+                previous.make_move(action)
+                found = previous.key() == key
+                previous.undo_move(action)
+                if found:
+                    child.parent = None
+                    self.root, self.root_key = child, key
+                    return child
+        self.root, self.root_key, self.root_geom = Node(), key, state.geom
+        return self.root
+
+    def _iterate(self, node, state):
+        """One selection, expansion, simulation and backpropagation pass."""
+        stats = self.stats
+        ply = 0
+        # 1) selection: follow UCB1 while the node is fully expanded
+        while node.untried is not None and not node.untried and node.children:
+            log_n = math.log(node.visits)
+            c = self.c
+            node = max(node.children.values(),
+                       key=lambda n: n.wins / n.visits + c * math.sqrt(log_n / n.visits))
+            state.make_move(node.action)
+            ply += 1
+
+        # 2) expansion: add one untried move
+        if node.untried is None:
+            node.untried = [] if state.is_terminal() else state.get_legal_actions()
+            self.rng.shuffle(node.untried)
+        if node.untried:
+            action = node.untried.pop()
+            child = node.children[action] = Node(node, action)
+            state.make_move(action)
+            node = child
+            ply += 1
+        if stats is not None:
+            stats.enter(ply)
+
+        # 3) simulation, scored for the player who made node's move
+        n = self.batch
+        if state.is_terminal():
+            if stats is not None:
+                stats.terminals += 1
+            winner = state.winner()
+            if winner is None:
+                score = 0.5 * n
+            else:
+                # the game ended on the move into node
+                score = float(n)
+        else:
+            if stats is not None:
+                stats.evals += n
+            wins_to_move, wins_other = random_playouts(state, n, self.rng, self.np_rng)
+            score = wins_other + 0.5 * (n - wins_to_move - wins_other)
+
+        # 4) backpropagation, switching sides at every level
+        while node is not None:
+            node.visits += n
+            node.wins += score
+            score = n - score
+            node = node.parent
@@ -1,88 +1,90 @@
 # measure_metrics.py
 
-import time
 import argparse
 
-from game import GameState
+from agent_base import timed_get_action
+from game import GameState, parse_board_size
 from minimax_agent import MinimaxAgent
 from alphabeta_agent import AlphaBetaAgent
 from expectimax_agent import ExpectimaxAgent
+from table_agent import TableAgent
+from negamax_agent import NegamaxAgent, PVSAgent, MTDfAgent
+from mcts_agent import MCTSAgent
+from opening_book import open_book, BookAgent
+from profiling import MoveProfiler
 from evaluation import betterEvaluationFunction  
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
 
 
-def instrument_agent(agent):
-    
-    # pick the right recursive method name
-    if hasattr(agent, "minimax"):
-        search_attr = "minimax"
-    elif hasattr(agent, "alphabeta"):
-        search_attr = "alphabeta"
-    elif hasattr(agent, "expectimax"):
-        search_attr = "expectimax"
+def make_agent(name: str, *, tt_size=None, tt_policy="lru", symmetry=False, table_path="solution_table.bin",
+               db_path=None, table_values="minimax", time_ms=None, ordering=None, workers=None,
+               memo=False, prune=False, policy="uniform", temperature=1.0, iterations=1000,
+               batch_eval=False, books=(), endgame=None, extend=False, seed=None):
+    # each agent gets its own table of tt_size entries (agents could share
+    # one, see Agent.tt_space, but would then compete for its slots)
+    tt = TranspositionTable(tt_size, tt_policy) if tt_size else None
+    if name == "MinimaxAgent":
+        agent = MinimaxAgent(tt=tt, symmetry=symmetry, endgame=endgame, extend=extend)
+    elif name == "AlphaBetaAgent":
+        agent = AlphaBetaAgent(tt=tt, symmetry=symmetry, time_ms=time_ms,
+                               ordering=MoveOrderer(ordering) if ordering else None,
+                               workers=workers, batch_eval=batch_eval, endgame=endgame, extend=extend)
+    elif name == "ExpectimaxAgent":
+        agent = ExpectimaxAgent(tt=tt, symmetry=symmetry, workers=workers, memo=memo, prune=prune,
+                                policy=policy, temperature=temperature, endgame=endgame, extend=extend)
+    elif name in ("NegamaxAgent", "PVSAgent", "MTDfAgent"):
+        cls = {"NegamaxAgent": NegamaxAgent, "PVSAgent": PVSAgent, "MTDfAgent": MTDfAgent}[name]
+        agent = cls(tt=tt, symmetry=symmetry, ordering=MoveOrderer(ordering) if ordering else None,
+                    endgame=endgame, extend=extend)
+    elif name == "MCTSAgent":
+        agent = MCTSAgent(iterations=iterations, time_ms=time_ms, seed=seed)
+    elif name == "TableAgent":
+        agent = TableAgent(table_path, db=db_path, values=table_values)
     else:
-        raise AttributeError(f"Unknown agent type for instrumentation: {type(agent).__name__}")
-
-    original_search = getattr(agent, search_attr)
-
-    def counted_search(*args, **kwargs):
-        # count every recursive invocation as one node expansion
-        agent._nodes_this_move += 1
-        return original_search(*args, **kwargs)
-
-    setattr(agent, search_attr, counted_search)
-
-    original_get_action = agent.get_action
-
-    def timed_get_action(state, depth=None):
-        # reset counter and time this decision
-        agent._nodes_this_move = 0
-        t0 = time.perf_counter()
-        action = original_get_action(state, depth)
-        t1 = time.perf_counter()
-        agent._last_time_ms = (t1 - t0) * 1000.0
-        agent._last_nodes = agent._nodes_this_move
-        return action
-
-    agent.get_action = timed_get_action  # monkey-patch
-    agent._last_time_ms = 0.0
-    agent._last_nodes = 0
-    agent._nodes_this_move = 0
+        raise ValueError(f"Unknown agent name: {name}")
+    # opening books are built for one agent each; wrap this one in its own
+    for path in books or ():
+        book = open_book(path)
+        if book.agent == name:
+            agent = BookAgent(agent, book)
+            break
+    # the agents count nodes themselves, read back from agent.stats per move
+    agent.enable_stats()
     return agent
 
-def make_agent(name: str):
-    if name == "MinimaxAgent":
-        return instrument_agent(MinimaxAgent())
-    if name == "AlphaBetaAgent":
-        return instrument_agent(AlphaBetaAgent())
-    if name == "ExpectimaxAgent":
-        return instrument_agent(ExpectimaxAgent())
-    raise ValueError(f"Unknown agent name: {name}")
+
+def print_tt_stats(label, agent):
+    if agent.tt is None:
+        return
+    st = agent.tt.stats()
+    probes = st["hits"] + st["misses"]
+    hit_rate = 100.0 * st["hits"] / probes if probes else 0.0
+    print(f"TT {label}: size={st['size']}  hits={st['hits']}  misses={st['misses']}  "
+          f"hit_rate={hit_rate:.1f}%  stores={st['stores']}  evictions={st['evictions']}")
 
 
-def play_one_game(agentX, agentO, depth=None, quiet=False):
-    state = GameState()
+def play_one_game(agentX, agentO, depth=None, quiet=False, rows=3, cols=3, k=3, profiler=None):
+    state = GameState(rows=rows, cols=cols, k=k)
+    if profiler is not None:
+        profiler.new_game()
+    timed = profiler.timed_get_action if profiler is not None else timed_get_action
     totals = {"X_ms":0.0,"X_nodes":0,"X_moves":0,"O_ms":0.0,"O_nodes":0,"O_moves":0}
 
     while not state.is_terminal():
         current = state.to_move
         agent = agentX if current == 'X' else agentO
 
-        action = agent.get_action(state, depth)
+        action, ms = timed(agent, state, depth)
         state = state.generate_successor(action)
 
         # record metrics for this move
-        if current == 'X':
-            totals["X_ms"] += agent._last_time_ms
-            totals["X_nodes"] += agent._last_nodes
-            totals["X_moves"] += 1
-            if not quiet:
-                print(f"[X:{type(agentX).__name__}] move={action}  time={agent._last_time_ms:.3f} ms  nodes={agent._last_nodes}")
-        else:
-            totals["O_ms"] += agent._last_time_ms
-            totals["O_nodes"] += agent._last_nodes
-            totals["O_moves"] += 1
-            if not quiet:
-                print(f"[O:{type(agentO).__name__}] move={action}  time={agent._last_time_ms:.3f} ms  nodes={agent._last_nodes}")
+        totals[f"{current}_ms"] += ms
+        totals[f"{current}_nodes"] += agent.stats.nodes
+        totals[f"{current}_moves"] += 1
+        if not quiet:
+            print(f"[{current}:{type(agent).__name__}] move={action}  time={ms:.3f} ms  "
+                  f"{agent.stats}")
 
     # compute averages
     X_avg_ms = (totals["X_ms"] / totals["X_moves"]) if totals["X_moves"] else 0.0
@@ -108,26 +110,96 @@ def play_one_game(agentX, agentO, depth=None, quiet=False):
 def main():
     parser = argparse.ArgumentParser(description="Measure decision time and nodes expanded per move (no dependency on run_game.py).")
     parser.add_argument("-p","--player", default="AlphaBetaAgent",
-                        choices=["MinimaxAgent","AlphaBetaAgent","ExpectimaxAgent"],
+                        choices=["MinimaxAgent","AlphaBetaAgent","ExpectimaxAgent","TableAgent",
+                                 "NegamaxAgent","PVSAgent","MTDfAgent","MCTSAgent"],
                         help="Agent playing as X")
     parser.add_argument("--opp","--opponent", dest="opponent", default="ExpectimaxAgent",
-                        choices=["MinimaxAgent","AlphaBetaAgent","ExpectimaxAgent"],
+                        choices=["MinimaxAgent","AlphaBetaAgent","ExpectimaxAgent","TableAgent",
+                                 "NegamaxAgent","PVSAgent","MTDfAgent","MCTSAgent"],
                         help="Agent playing as O")
     parser.add_argument("--depth", type=int, default=None, help="Optional depth limit")
+    parser.add_argument("--size", type=parse_board_size, default=(3, 3),
+                        help="Board size, N or ROWSxCOLS (default: 3)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="Marks in a row needed to win (default: the board's shorter side)")
+    parser.add_argument("--time-ms", type=float, default=None,
+                        help="Per-move time budget for AlphaBetaAgent (iterative deepening) "
+                             "and MCTSAgent")
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="MCTSAgent iterations per move (when --time-ms is not set)")
+    parser.add_argument("--ordering", default=None,
+                        help="Comma-separated AlphaBeta/Negamax move ordering strategies "
+                             "(pv,killer,history,static); default: legal-move order")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Search root moves of AlphaBetaAgent/ExpectimaxAgent in N processes "
+                             "(AlphaBetaAgent: not with --time-ms)")
+    parser.add_argument("--batch-eval", action="store_true",
+                        help="AlphaBetaAgent scores all children at the depth limit in one batch "
+                             "(faster on large boards with NumPy)")
+    parser.add_argument("--memo", action="store_true",
+                        help="ExpectimaxAgent caches values by position and remaining depth")
+    parser.add_argument("--prune", action="store_true",
+                        help="Star1 pruning of ExpectimaxAgent chance nodes (full-depth searches)")
+    parser.add_argument("--policy", default="uniform", choices=["uniform", "softmax"],
+                        help="How ExpectimaxAgent expects O to move")
+    parser.add_argument("--temperature", type=float, default=1.0,
+                        help="Temperature of the softmax policy")
+    parser.add_argument("--endgame", type=int, default=None,
+                        help="Hybrid mode: solve positions at the depth limit with at most N empty "
+                             "cells exactly (MinimaxAgent then honors --depth too)")
+    parser.add_argument("--extend", action="store_true",
+                        help="Hybrid mode: search forcing positions at the depth limit one ply further")
     parser.add_argument("--games", type=int, default=1, help="Repeat games and average summaries")
     parser.add_argument("--quiet", action="store_true", help="Suppress per-move lines")
+    parser.add_argument("--tt-size", type=int, default=None,
+                        help="Enable a transposition table with this many entries per agent")
+    parser.add_argument("--tt-policy", default="lru", choices=["lru", "fifo"],
+                        help="Transposition table eviction policy")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="Key the table on symmetry-canonical positions and skip symmetric moves")
+    parser.add_argument("--table", default="solution_table.bin",
+                        help="Solution table file for TableAgent (built if missing)")
+    parser.add_argument("--db", default=None,
+                        help="Memory-mapped position database for TableAgent, used instead of --table")
+    parser.add_argument("--table-values", default="minimax", choices=["minimax", "expectimax"],
+                        help="Which stored values TableAgent plays by (expectimax needs --db)")
+    parser.add_argument("--book", default=None,
+                        help="Comma-separated opening books (opening_book.py); each agent plays "
+                             "from the book built for it while in book")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every move; print a hot-function report of the whole run")
+    parser.add_argument("--profile-threshold-ms", type=float, default=100.0,
+                        help="With --profile, dump moves at least this slow to --profile-dir")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="Directory for the pstats files of slow moves")
     args = parser.parse_args()
-
-    # create & instrument agents
-    agentX = make_agent(args.player)
-    agentO = make_agent(args.opponent)
+    if (args.time_ms is not None and args.workers and args.workers > 1
+            and "AlphaBetaAgent" in (args.player, args.opponent)):
+        parser.error("AlphaBetaAgent takes --time-ms or --workers, not both")
+    ordering = tuple(args.ordering.split(",")) if args.ordering else None
+    books = args.book.split(",") if args.book else ()
+    rows, cols = args.size
+    k = args.k if args.k is not None else min(rows, cols)
+
+    # create agents with search stats enabled
+    options = dict(tt_size=args.tt_size, tt_policy=args.tt_policy, symmetry=args.symmetry,
+                   table_path=args.table, db_path=args.db, table_values=args.table_values,
+                   time_ms=args.time_ms, ordering=ordering, workers=args.workers, memo=args.memo,
+                   prune=args.prune, policy=args.policy, temperature=args.temperature,
+                   iterations=args.iterations, batch_eval=args.batch_eval, books=books,
+                   endgame=args.endgame, extend=args.extend)
+    agentX = make_agent(args.player, **options)
+    agentO = make_agent(args.opponent, **options)
+
+    profiler = MoveProfiler(args.profile_threshold_ms, args.profile_dir) if args.profile else None
 
     # run games
     sums = {"X_ms":0.0,"O_ms":0.0,"X_nodes":0.0,"O_nodes":0.0,"n":0}
     for g in range(args.games):
         if not args.quiet:
-            print(f"\n=== GAME {g+1} | X={args.player}  O={args.opponent}  depth={'full' if args.depth is None else args.depth} ===")
-        res = play_one_game(agentX, agentO, depth=args.depth, quiet=args.quiet)
+            print(f"\n=== GAME {g+1} | X={args.player}  O={args.opponent}  depth={'full' if args.depth is None else args.depth}  board={rows}x{cols} k={k} ===")
+        res = play_one_game(agentX, agentO, depth=args.depth, quiet=args.quiet, rows=rows, cols=cols, k=k,
+                            profiler=profiler)
         sums["X_ms"] += res["X_avg_ms"]; sums["O_ms"] += res["O_avg_ms"]
         sums["X_nodes"] += res["X_avg_nodes"]; sums["O_nodes"] += res["O_avg_nodes"]
         sums["n"] += 1
@@ -137,5 +209,15 @@ def main():
         print(f"X ({args.player}): {sums['X_ms']/sums['n']:.3f} ms | {sums['X_nodes']/sums['n']:.1f} nodes/move")
         print(f"O ({args.opponent}): {sums['O_ms']/sums['n']:.3f} ms | {sums['O_nodes']/sums['n']:.1f} nodes/move")
 
+    print()
+    print_tt_stats(f"X ({args.player})", agentX)
+    print_tt_stats(f"O ({args.opponent})", agentO)
+    for label, agent in ((f"X ({args.player})", agentX), (f"O ({args.opponent})", agentO)):
+        if isinstance(agent, BookAgent):
+            print(f"Book {label}: hits={agent.hits}  misses={agent.misses}")
+    if profiler is not None:
+        print()
+        print(profiler.report())
+
 if __name__ == "__main__":
     main()
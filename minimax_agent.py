@@ -1,42 +1,104 @@
 # minimax_agent.py
 from agent_base import Agent
 from game import GameState
+from transposition import EXACT
+from evaluation import betterEvaluationFunction, heuristic_bound
+from endgame import EndgameSolver, forced_move
 
 class MinimaxAgent(Agent):
+    def __init__(self, tt=None, symmetry=False, endgame=None, extend=False):
+        super().__init__(tt=tt, symmetry=symmetry)
+        # hybrid mode, as for AlphaBetaAgent; only in this mode does
+        # get_action honor the depth limit
+        self.endgame = endgame
+        self.extend = extend
+        self.hybrid = endgame is not None or extend
+        self.solver = EndgameSolver() if endgame is not None else None
+
     def get_action(self, state: GameState, depth=None):
-        _, action = self.minimax(state)
+        # search on a private copy, moves are made and undone in place
+        self.last_value, action = self.minimax(state.copy(), depth if self.hybrid else None)
         return action
 
-    def minimax(self, state, depth_limit=None):
+    def minimax(self, state, depth_limit=None, current_depth=0):
         """
         Minimax basically looks ahead at all the possible game states.
         X is the maximizing player, O is the minimizing one.
         We go down the tree until the game is over and then bubble the values back up.
         """
 
+        stats = self.stats
+        if stats is not None:
+            stats.enter(current_depth)
+
         # 1) if the game already ended, just give back the utility score
         if state.is_terminal():
+            if stats is not None:
+                stats.terminals += 1
             return state.utility(), None
 
-        # 2) if it's X’s turn, try to get the biggest value
+        # 2) at the depth limit: solve small endgames, settle forcing
+        #    positions, guess the rest with the heuristic
+        if depth_limit is not None and current_depth >= depth_limit:
+            if self.solver is not None and state.empty_count() <= self.endgame:
+                return self.solver.solve(state, stats, current_depth), None
+            if self.extend:
+                value, block = forced_move(state)
+                if value is not None:
+                    if stats is not None:
+                        stats.evals += 1
+                    return value, None
+                if block is not None:
+                    # every other move loses at once: follow the block one ply further
+                    if stats is not None:
+                        stats.expand(current_depth)
+                    state.make_move(block)
+                    value, _ = self.minimax(state, depth_limit + 1, current_depth + 1)
+                    state.undo_move(block)
+                    return value, block
+            if stats is not None:
+                stats.evals += 1
+            return betterEvaluationFunction(state) / heuristic_bound(state.geom), None
+
+        # 3) if we already solved this position, reuse the answer
+        tt = self.tt
+        if tt is not None:
+            key, sym = self.tt_key(state)
+            remaining = state.empty_count()
+            if depth_limit is not None:
+                remaining = min(remaining, depth_limit - current_depth)
+            entry = self.tt_probe(key, sym)
+            # bounds stored by AlphaBetaAgent in a shared table are not values
+            if entry is not None and entry[2] == remaining and entry[3] == EXACT:
+                if stats is not None:
+                    stats.tt_hits += 1
+                return entry[0], entry[1]
+        if stats is not None:
+            stats.expand(current_depth)
+
+        # 4) if it's X’s turn, try to get the biggest value
         if state.to_move == 'X':
             best_val = float('-inf')
             best_act = None
-            for a in state.get_legal_actions():
-                # make the move and check what happens
-                succ = state.generate_successor(a)
-                val, _ = self.minimax(succ)
+            for a in self.legal_actions(state):
+                # make the move, check what happens, then take it back
+                state.make_move(a)
+                val, _ = self.minimax(state, depth_limit, current_depth + 1)
+                state.undo_move(a)
                 if val > best_val:
                     best_val, best_act = val, a
-            return best_val, best_act
 
-        # 3) if it's O’s turn, try to make the value as small as possible
+        # 5) if it's O’s turn, try to make the value as small as possible
         else:
             best_val = float('inf')
             best_act = None
-            for a in state.get_legal_actions():
-                succ = state.generate_successor(a)
-                val, _ = self.minimax(succ)
+            for a in self.legal_actions(state):
+                state.make_move(a)
+                val, _ = self.minimax(state, depth_limit, current_depth + 1)
+                state.undo_move(a)
                 if val < best_val:
                     best_val, best_act = val, a
-            return best_val, best_act
+
+        if tt is not None:
+            self.tt_store(key, sym, best_val, best_act, remaining, EXACT)
+        return best_val, best_act
@@ -0,0 +1,222 @@
+# negamax_agent.py
+#
+# One search for both players: every value is from the point of view of
+# the side to move, so a child's value is negated instead of switching
+# between max and min branches. Three variants share it:
+#   NegamaxAgent  fail-soft alpha-beta
+#   PVSAgent      principal variation search: the first move gets the full
+#                 window, the others a null window, re-searched only if
+#                 they turn out better
+#   MTDfAgent     MTD(f): a series of null-window searches around a guess,
+#                 relying on the transposition table to avoid repeating work
+
+from agent_base import Agent
+from game import GameState
+from evaluation import betterEvaluationFunction, IncrementalEvaluator, heuristic_bound
+from endgame import EndgameSolver, forced_move
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+VARIANTS = ("alphabeta", "pvs", "mtdf")
+
+# width of a null window; values are never closer together than this
+EPSILON = 1e-9
+
+
+class NegamaxAgent(Agent):
+    variant = "alphabeta"
+    # values from the side to move's point of view, not X's
+    TT_SPACE = 2
+
+    def __init__(self, tt=None, symmetry=False, ordering=None, incremental_eval=True,
+                 endgame=None, extend=False):
+        # MTD(f) repeats the search many times and needs a table to be fast
+        if tt is None and self.variant == "mtdf":
+            tt = TranspositionTable()
+        super().__init__(tt=tt, symmetry=symmetry)
+        # optional MoveOrderer, as for AlphaBetaAgent
+        self.ordering = ordering
+        # depth-limited searches update the evaluation move by move
+        self.incremental_eval = incremental_eval
+        # hybrid mode, as for AlphaBetaAgent
+        self.endgame = endgame
+        self.extend = extend
+        self.hybrid = endgame is not None or extend
+        self.solver = EndgameSolver() if endgame is not None else None
+        self._evaluator = None
+
+    def get_action(self, state: GameState, depth=None):
+        """
+        Returns the best move index (0-8 on 3x3) using the agent's negamax variant.
+        """
+        if self.ordering is not None:
+            self.ordering.new_search()
+        # search on a private copy, moves are made and undone in place
+        root = state.copy()
+        if depth is not None and self.incremental_eval:
+            self._evaluator = IncrementalEvaluator(root)
+        try:
+            if self.variant == "mtdf":
+                value, action = self.mtdf(root, 0, depth)
+            else:
+                value, action = self.negamax(root, float('-inf'), float('inf'), depth, 0)
+        finally:
+            self._evaluator = None
+        # negamax values are the side to move's
+        self.last_value = value if state.to_move == 'X' else -value
+        # Safety fallback (never return None)
+        if action is None:
+            legal = state.get_legal_actions()
+            if legal:
+                action = legal[0]
+        return action
+
+    def mtdf(self, state: GameState, guess, depth_limit):
+        """
+        MTD(f) from a first guess of the value; returns (value, best_action)
+        for the side to move. Each null-window search moves the lower or the
+        upper bound onto a value that occurs in the tree, until they meet.
+        """
+        lower, upper = float('-inf'), float('inf')
+        value, action = guess, None
+        while lower < upper:
+            beta = value + EPSILON if value == lower else value
+            value, act = self.negamax(state, beta - EPSILON, beta, depth_limit, 0)
+            if value < beta:
+                upper = value
+            else:
+                # a fail high stops at a move reaching beta, so it is a best move
+                lower = value
+                action = act
+        return value, action
+
+    def negamax(self, state: GameState, alpha, beta, depth_limit, current_depth):
+        """
+        Fail-soft negamax returning (value, best_action), value from the side
+        to move's point of view. A value <= alpha is an upper bound and a
+        value >= beta a lower bound on the true value.
+        """
+        stats = self.stats
+        if stats is not None:
+            stats.enter(current_depth)
+        color = 1 if state.to_move == 'X' else -1
+        # 1) stop if game ended
+        if state.is_terminal():
+            if stats is not None:
+                stats.terminals += 1
+            return color * state.utility(), None
+        # 2) stop if we hit the depth limit, use heuristic
+        evaluator = self._evaluator
+        if depth_limit is not None and current_depth >= depth_limit:
+            if self.solver is not None and state.empty_count() <= self.endgame:
+                return color * self.solver.solve(state, stats, current_depth), None
+            if self.extend:
+                value, block = forced_move(state)
+                if value is not None:
+                    if stats is not None:
+                        stats.evals += 1
+                    return color * value, None
+                if block is not None:
+                    # every other move loses at once: follow the block one ply further
+                    if stats is not None:
+                        stats.expand(current_depth)
+                    player = state.to_move
+                    state.make_move(block)
+                    if evaluator is not None:
+                        evaluator.apply(block, player)
+                    value = -self.negamax(state, -beta, -alpha, depth_limit + 1, current_depth + 1)[0]
+                    state.undo_move(block)
+                    if evaluator is not None:
+                        evaluator.revert(block, player)
+                    return value, block
+            if stats is not None:
+                stats.evals += 1
+            if evaluator is not None:
+                value = evaluator.value(state)
+            else:
+                value = betterEvaluationFunction(state)
+            if self.hybrid:
+                value /= heuristic_bound(state.geom)
+            return color * value, None
+
+        remaining = state.empty_count()
+        if depth_limit is not None:
+            remaining = min(remaining, depth_limit - current_depth)
+
+        # 3) reuse a stored result if it is exact or already outside the window
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            key, sym = self.tt_key(state)
+            entry = self.tt_probe(key, sym)
+            if entry is not None:
+                val, act, entry_depth, flag = entry
+                if entry_depth == remaining and (
+                        flag == EXACT or (flag == LOWER and val >= beta)
+                        or (flag == UPPER and val <= alpha)):
+                    if stats is not None:
+                        stats.tt_hits += 1
+                    return val, act
+                hash_move = act
+            alpha0, beta0 = alpha, beta
+
+        # 4) order the moves, the stored best move first
+        actions = self.legal_actions(state)
+        ordering = self.ordering
+        if ordering is not None:
+            pv_key = state.key()
+            actions = ordering.order(state, actions, current_depth, hash_move)
+        elif hash_move is not None and hash_move in actions:
+            actions.remove(hash_move)
+            actions.insert(0, hash_move)
+        if stats is not None:
+            stats.expand(current_depth)
+
+        # 5) search the moves, each child's value negated
+        player = state.to_move
+        pvs = self.variant == "pvs"
+        best_val = float('-inf')
+        best_act = None
+        for i, a in enumerate(actions):
+            state.make_move(a)
+            if evaluator is not None:
+                evaluator.apply(a, player)
+            if pvs and i > 0:
+                # null window: only asks whether a beats alpha
+                val = -self.negamax(state, -alpha - EPSILON, -alpha, depth_limit, current_depth + 1)[0]
+                if alpha < val < beta:
+                    val = -self.negamax(state, -beta, -alpha, depth_limit, current_depth + 1)[0]
+            else:
+                val = -self.negamax(state, -beta, -alpha, depth_limit, current_depth + 1)[0]
+            state.undo_move(a)
+            if evaluator is not None:
+                evaluator.revert(a, player)
+            if val > best_val:
+                best_val, best_act = val, a
+                if val > alpha:
+                    alpha = val
+                    if alpha >= beta:  # prune
+                        if stats is not None:
+                            stats.cutoffs += 1
+                        if ordering is not None:
+                            ordering.record_cutoff(a, current_depth, remaining)
+                        break
+
+        if ordering is not None and best_act is not None:
+            ordering.record_best(pv_key, best_act)
+        if tt is not None:
+            if best_val <= alpha0:
+                flag = UPPER
+            elif best_val >= beta0:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt_store(key, sym, best_val, best_act, remaining, flag)
+        return best_val, best_act
+
+
+class PVSAgent(NegamaxAgent):
+    variant = "pvs"
+
+
+class MTDfAgent(NegamaxAgent):
+    variant = "mtdf"
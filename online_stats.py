@@ -0,0 +1,103 @@
+# online_stats.py
+#
+# Constant-memory summaries for long runs: every value is folded in as it
+# arrives and nothing is kept per sample, so a tournament of millions of
+# games aggregates in the same memory as one of ten.
+
+import math
+
+
+class RunningStats:
+    """Count, mean, variance, min and max (Welford's algorithm)."""
+
+    __slots__ = ("n", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """Folds in another RunningStats (e.g. one from a worker process)."""
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self._m2 = other.n, other.mean, other._m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self._m2 += other._m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class LogHistogram:
+    """
+    Histogram with logarithmic buckets, for percentiles of positive values
+    such as latencies. Bucket i holds values in [base**i, base**(i+1)), so
+    a quantile is off by at most a factor of base (about 3% by default) and
+    the number of buckets only grows with the log of the value range.
+    Values <= 0 are counted in a separate zero bucket.
+    """
+
+    __slots__ = ("base", "_log_base", "counts", "zeros", "n")
+
+    def __init__(self, base=1.03):
+        self.base = base
+        self._log_base = math.log(base)
+        self.counts = {}
+        self.zeros = 0
+        self.n = 0
+
+    def add(self, x):
+        self.n += 1
+        if x <= 0:
+            self.zeros += 1
+            return
+        i = math.floor(math.log(x) / self._log_base)
+        self.counts[i] = self.counts.get(i, 0) + 1
+
+    def merge(self, other):
+        if other.base != self.base:
+            raise ValueError("Cannot merge histograms with different bases")
+        self.n += other.n
+        self.zeros += other.zeros
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), the midpoint of its bucket."""
+        if self.n == 0:
+            return 0.0
+        rank = q * (self.n - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if rank < seen:
+                return self.base ** (i + 0.5)
+        return self.base ** (max(self.counts) + 0.5)
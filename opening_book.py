@@ -0,0 +1,202 @@
+# opening_book.py
+#
+# Opening book: the moves an agent chooses in the first plies of a game,
+# searched once and stored, so games no longer pay for the most expensive
+# searches (the empty board alone costs MinimaxAgent about 550k nodes).
+#
+# The builder searches every position of the first --plies plies, following
+# all legal moves of both sides. Positions are stored under their
+# symmetry-canonical key, so each class of equivalent positions is searched
+# once. A book belongs to one agent and depth on one board; BookAgent
+# answers from it only for that depth and board and searches everything
+# else, and make_agent (measure_metrics.py) only wraps the agent it names.
+#
+# Layout (little endian):
+#   header  magic "TTOB", version, rows, cols, k, plies, depth (-1 = full),
+#           agent name length, record count
+#   agent   name of the agent class the moves come from (ASCII)
+#   records canonical key (key_bytes) + canonical move (1 byte)
+#
+# Usage:
+#   python opening_book.py --agent MinimaxAgent --plies 2 --out book.bin
+#   python opening_book.py --agent AlphaBetaAgent --size 4 --k 3 --depth 4 --plies 3
+#   python measure_metrics.py -p MinimaxAgent --book book.bin
+
+import argparse
+import struct
+import time
+
+from agent_base import Agent
+from game import GameState, parse_board_size
+from symmetry import canonical, from_canonical_action
+
+MAGIC = b"TTOB"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBBBbHI")
+
+DEFAULT_PATH = "opening_book.bin"
+
+
+def key_bytes(cells):
+    """Bytes needed for a GameState.key() on a board of cells cells."""
+    return (2 * cells + 8) // 8
+
+
+class OpeningBook:
+    """
+    moves   {canonical key: canonical move}
+    depth   search depth the moves were found with (None = full)
+    agent   name of the agent the moves come from
+    """
+
+    def __init__(self, moves, rows=3, cols=3, k=3, plies=0, depth=None, agent=""):
+        self.moves = moves
+        self.rows, self.cols, self.k = rows, cols, k
+        self.plies = plies
+        self.depth = depth
+        self.agent = agent
+
+    def __len__(self):
+        return len(self.moves)
+
+    def lookup(self, state, depth=None):
+        """Book move for state on its own board, or None if out of book."""
+        geom = state.geom
+        if (geom.rows, geom.cols, geom.k) != (self.rows, self.cols, self.k) or depth != self.depth:
+            return None
+        key, s = canonical(state)
+        action = self.moves.get(key)
+        if action is None:
+            return None
+        return from_canonical_action(action, s)
+
+    def save(self, path=DEFAULT_PATH):
+        agent = self.agent.encode()
+        size = key_bytes(self.rows * self.cols)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.rows, self.cols, self.k, self.plies,
+                                -1 if self.depth is None else self.depth, len(agent), len(self.moves)))
+            f.write(agent)
+            for key in sorted(self.moves):
+                f.write(key.to_bytes(size, "little") + bytes((self.moves[key],)))
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, rows, cols, k, plies, depth, agent_len, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        pos = HEADER.size
+        agent = data[pos:pos + agent_len].decode()
+        pos += agent_len
+        size = key_bytes(rows * cols)
+        moves = {}
+        for _ in range(count):
+            moves[int.from_bytes(data[pos:pos + size], "little")] = data[pos + size]
+            pos += size + 1
+        return cls(moves, rows, cols, k, plies, None if depth < 0 else depth, agent)
+
+
+_books = {}
+
+
+def open_book(path):
+    """OpeningBook in path, loaded once per process (books are never modified)."""
+    book = _books.get(path)
+    if book is None:
+        book = _books[path] = OpeningBook.load(path)
+    return book
+
+
+def build_book(agent, plies, depth=None, rows=3, cols=3, k=3, verbose=False):
+    """
+    Searches every non-terminal position of the first plies plies with agent
+    at depth and returns the OpeningBook of its choices.
+    """
+    moves = {}
+    layer = [canonical(GameState(rows=rows, cols=cols, k=k))[0]]
+    for ply in range(plies):
+        t0 = time.perf_counter()
+        following = set()
+        for key in layer:
+            state = GameState.from_key(key, rows, cols, k)
+            if state.is_terminal():
+                continue
+            # the key is canonical, so the move is already in canonical orientation
+            moves[key] = agent.get_action(state, depth)
+            if ply + 1 < plies:
+                for a in state.get_legal_actions():
+                    state.make_move(a)
+                    following.add(canonical(state)[0])
+                    state.undo_move(a)
+        if verbose:
+            print(f"ply {ply}: {len(layer)} positions in {time.perf_counter() - t0:.2f} s")
+        layer = sorted(following)
+    return OpeningBook(moves, rows, cols, k, plies, depth, type(agent).__name__)
+
+
+class BookAgent(Agent):
+    """
+    Plays agent's moves, taken from book while the position is in it and
+    searched by agent otherwise. A book move counts as one node in stats.
+    """
+
+    def __init__(self, agent, book):
+        super().__init__(tt=agent.tt, symmetry=agent.symmetry)
+        self.agent = agent
+        self.book = book
+        self.hits = 0
+        self.misses = 0
+
+    def enable_stats(self):
+        stats = super().enable_stats()
+        self.agent.stats = stats
+        return stats
+
+    def get_action(self, state: GameState, depth=None):
+        action = self.book.lookup(state, depth)
+        if action is None:
+            self.misses += 1
+            action = self.agent.get_action(state, depth)
+            self.last_value = self.agent.last_value
+            return action
+        self.hits += 1
+        # the book keeps moves only
+        self.last_value = None
+        if self.stats is not None:
+            self.stats.enter(0)
+        return action
+
+
+def main():
+    # imported here because measure_metrics imports this module for BookAgent
+    from measure_metrics import make_agent
+
+    parser = argparse.ArgumentParser(description="Build an opening book for one agent.")
+    parser.add_argument("--agent", default="AlphaBetaAgent", help="Agent whose moves are stored")
+    parser.add_argument("--plies", type=int, default=2, help="Plies from the empty board to cover")
+    parser.add_argument("--depth", type=int, default=None, help="Search depth (default: full)")
+    parser.add_argument("--size", type=parse_board_size, default=(3, 3),
+                        help="Board size, N or RxC (default: 3)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="Marks in a row needed to win (default: shorter side)")
+    parser.add_argument("--tt-size", type=int, default=None,
+                        help="Transposition table entries for the building agent")
+    parser.add_argument("--ordering", default=None,
+                        help="Move ordering heuristics of the building agent")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="Output file")
+    args = parser.parse_args()
+    rows, cols = args.size
+    k = args.k if args.k is not None else min(rows, cols)
+    ordering = tuple(args.ordering.split(",")) if args.ordering else None
+
+    agent = make_agent(args.agent, tt_size=args.tt_size, ordering=ordering)
+    book = build_book(agent, args.plies, args.depth, rows, cols, k, verbose=True)
+    book.save(args.out)
+    print(f"Wrote {len(book)} positions ({args.agent}, depth={'full' if args.depth is None else args.depth}) "
+          f"to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
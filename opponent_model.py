@@ -0,0 +1,61 @@
+# opponent_model.py
+#
+# Move distributions for the chance (O) nodes of ExpectimaxAgent. A policy
+# is any callable policy(state, actions) -> weights, one non-negative
+# weight per action; the chance node averages the children with those
+# weights (they need not sum to 1). None stands for the uniform policy.
+
+import math
+
+from evaluation import betterEvaluationFunction
+
+POLICIES = ("uniform", "softmax")
+
+
+class SoftmaxPolicy:
+    """
+    Weights every move by exp(-h / temperature), where h is the heuristic
+    score (X's point of view) after the move, so O prefers moves that are
+    bad for X. A move that ends the game scores utility * win_score, which
+    puts an immediate win far ahead of any heuristic advantage.
+    Low temperatures approach minimax, high ones the uniform policy.
+    """
+
+    def __init__(self, temperature=1.0, win_score=100.0):
+        if temperature <= 0:
+            raise ValueError("temperature must be positive")
+        self.temperature = temperature
+        self.win_score = win_score
+
+    # equal settings give equal weights, so agents using equal policies can
+    # share table entries (ExpectimaxAgent.tt_space)
+    def __eq__(self, other):
+        return (isinstance(other, SoftmaxPolicy) and self.temperature == other.temperature
+                and self.win_score == other.win_score)
+
+    def __hash__(self):
+        return hash((self.temperature, self.win_score))
+
+    def __call__(self, state, actions):
+        scores = []
+        for a in actions:
+            state.make_move(a)
+            if state.is_terminal():
+                scores.append(state.utility() * self.win_score)
+            else:
+                scores.append(betterEvaluationFunction(state))
+            state.undo_move(a)
+        # the sign is flipped because O minimizes X's score
+        best = min(scores)
+        return [math.exp((best - h) / self.temperature) for h in scores]
+
+
+def make_policy(name="uniform", temperature=1.0):
+    """Policy for a name in POLICIES (None for uniform), or a callable unchanged."""
+    if callable(name):
+        return name
+    if name == "uniform":
+        return None
+    if name == "softmax":
+        return SoftmaxPolicy(temperature)
+    raise ValueError(f"Unknown opponent policy: {name}")
@@ -0,0 +1,169 @@
+# parallel.py
+#
+# Root-split parallel search. The root moves of AlphaBetaAgent and
+# ExpectimaxAgent are independent subtrees, so they are handed out to a
+# persistent ProcessPoolExecutor. For alpha-beta the first root move is
+# searched locally (young brothers wait) and its value is published in a
+# shared bound that later subtrees use as their window, so they still prune.
+#
+# The result is the same move and value the serial search returns: the root
+# moves are resolved in the serial order, and a subtree that failed low
+# against a bound coming from a later move is searched again locally when
+# that could change the answer.
+
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+_pools = {}             # workers -> (executor, shared bound, lock)
+_pools_lock = threading.Lock()
+
+# worker process globals
+_bound = None
+_agents = {}
+_searches = {}          # token -> number of the root search the agent is in
+
+
+def _init_worker(bound):
+    global _bound
+    _bound = bound
+
+
+def get_pool(workers):
+    """Returns (executor, bound, lock) for a pool of this size, created once."""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            bound = multiprocessing.Value('d', 0.0)
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(bound,))
+            # the shared bound belongs to one search at a time
+            pool = (executor, bound, threading.Lock())
+            _pools[workers] = pool
+        return pool
+
+
+def shutdown_pools():
+    with _pools_lock:
+        for executor, _, _ in _pools.values():
+            executor.shutdown()
+        _pools.clear()
+
+
+def _worker_agent(token, template, search=None):
+    # one agent per parent agent and worker, so its table stays warm
+    agent = _agents.get(token)
+    if agent is None:
+        agent = _agents[token] = template
+    # a worker gets several subtrees of one root search: the move ordering
+    # starts a new search (killers reset, history aged) at the first one,
+    # as get_action does in the serial search
+    if search is not None and _searches.get(token) != search:
+        _searches[token] = search
+        if getattr(agent, "ordering", None) is not None:
+            agent.ordering.new_search()
+    return agent
+
+
+def _alphabeta_task(token, template, search, state, action, maximize, depth_limit):
+    agent = _worker_agent(token, template, search)
+    if agent.stats is not None:
+        agent.stats.reset()
+    bound = _bound.value
+    alpha, beta = (bound, float('inf')) if maximize else (float('-inf'), bound)
+    state.make_move(action)
+    value, _ = agent.alphabeta(state, alpha, beta, depth_limit, 1)
+    # publish an exact improvement so subtrees still waiting can prune more
+    if (value > bound) if maximize else (value < bound):
+        with _bound.get_lock():
+            if (value > _bound.value) if maximize else (value < _bound.value):
+                _bound.value = value
+    return value, bound, agent.stats
+
+
+def _expectimax_task(token, template, state, action, depth_limit):
+    agent = _worker_agent(token, template)
+    if agent.stats is not None:
+        agent.stats.reset()
+    state.make_move(action)
+    value, _ = agent.expectimax(state, depth_limit, 1)
+    return value, agent.stats
+
+
+def _token(agent):
+    if getattr(agent, "_worker_token", None) is None:
+        agent._worker_token = uuid.uuid4().hex
+    return agent._worker_token
+
+
+def parallel_alphabeta(agent, state, actions, depth_limit):
+    """
+    Root-split alpha-beta over actions (already in search order) from state.
+    Returns (value, best_action) exactly as agent.alphabeta would at the root.
+    """
+    maximize = state.to_move == 'X'
+    better = (lambda v, b: v > b) if maximize else (lambda v, b: v < b)
+    executor, bound, lock = get_pool(agent.workers)
+    token, template = _token(agent), agent.worker_copy()
+    agent._worker_search = search = getattr(agent, "_worker_search", 0) + 1
+    stats = agent.stats
+    if stats is not None:
+        stats.enter(0)
+        stats.expand(0)
+
+    with lock:
+        # young brothers wait: the eldest move is searched here first
+        first = actions[0]
+        state.make_move(first)
+        best_val, _ = agent.alphabeta(state, float('-inf'), float('inf'), depth_limit, 1)
+        state.undo_move(first)
+        best_act = first
+        bound.value = best_val
+
+        futures = [executor.submit(_alphabeta_task, token, template, search, state, a, maximize,
+                                   depth_limit)
+                   for a in actions[1:]]
+        for a, fut in zip(actions[1:], futures):
+            val, used, worker_stats = fut.result()
+            if stats is not None:
+                stats.merge(worker_stats)
+            if better(val, used):
+                # inside the window, so val is exact
+                if better(val, best_val):
+                    best_val, best_act = val, a
+            elif better(val, best_val):
+                # failed against a bound from a later move: val is only a
+                # bound, and the move may still beat every earlier one
+                state.make_move(a)
+                if maximize:
+                    val, _ = agent.alphabeta(state, best_val, float('inf'), depth_limit, 1)
+                else:
+                    val, _ = agent.alphabeta(state, float('-inf'), best_val, depth_limit, 1)
+                state.undo_move(a)
+                if better(val, best_val):
+                    best_val, best_act = val, a
+    return best_val, best_act
+
+
+def parallel_expectimax(agent, state, actions, depth_limit):
+    """
+    Root-split expectimax for a MAX (X) root. Returns (value, best_action)
+    exactly as agent.expectimax would at the root.
+    """
+    executor, _, _ = get_pool(agent.workers)
+    token, template = _token(agent), agent.worker_copy()
+    stats = agent.stats
+    if stats is not None:
+        stats.enter(0)
+        stats.expand(0)
+    futures = [executor.submit(_expectimax_task, token, template, state, a, depth_limit)
+               for a in actions]
+    best_val, best_act = float('-inf'), None
+    for a, fut in zip(actions, futures):
+        val, worker_stats = fut.result()
+        if stats is not None:
+            stats.merge(worker_stats)
+        if val > best_val:
+            best_val, best_act = val, a
+    return best_val, best_act
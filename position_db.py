@@ -0,0 +1,164 @@
+# position_db.py
+#
+# Fixed-layout, memory-mapped database of solved 3x3 positions.
+#
+# Every board is given a slot by its base-3 index (cell i contributes
+# 0 / 1 / 2 * 3**i for empty / X / O), so there are 3**9 = 19,683 slots and a
+# lookup is one multiply-free table sum plus one struct.unpack_from on the
+# mapped file. The side to move follows from the piece counts, because the
+# database only holds positions reachable from the empty board with X first.
+#
+# The file is opened read-only with mmap, so any number of processes running
+# run_game.py or measure_metrics.py share one copy through the page cache.
+#
+# Layout (little endian):
+#   header  magic "TTDB", version, record size, slot count
+#   slots   one RECORD per base-3 index, see RECORD below
+#
+# Usage:
+#   python position_db.py --out positions.db
+
+import argparse
+import mmap
+import os
+import struct
+
+from game import GameState, FULL_MASK, DEFAULT_GEOMETRY
+from solution_table import solve, SolutionTable
+from expectimax_agent import ExpectimaxAgent
+from transposition import TranspositionTable
+
+MAGIC = b"TTDB"
+VERSION = 1     # bump whenever the layout or the stored values change
+HEADER = struct.Struct("<4sHHI")    # magic, version, record size, slot count
+# valid flag, minimax value, best-move mask, distance to end,
+# expectimax best action (-1 if none), expectimax value
+RECORD = struct.Struct("<BbHBbd")
+
+SLOTS = 3 ** 9
+DEFAULT_PATH = "positions.db"
+
+# base-3 contribution of every X mask and every O mask
+_X_INDEX = tuple(sum(3 ** i for i in range(9) if (m >> i) & 1) for m in range(FULL_MASK + 1))
+_O_INDEX = tuple(2 * v for v in _X_INDEX)
+
+
+def position_index(state):
+    """Base-3 slot index of state."""
+    return _X_INDEX[state.x_mask] + _O_INDEX[state.o_mask]
+
+
+def _reachable_states():
+    """Every position reachable from the empty board, each once."""
+    seen = set()
+    stack = [GameState()]
+    while stack:
+        state = stack.pop()
+        idx = position_index(state)
+        if idx in seen:
+            continue
+        seen.add(idx)
+        yield state
+        if not state.is_terminal():
+            for a in state.get_legal_actions():
+                stack.append(state.generate_successor(a))
+
+
+def build(path=DEFAULT_PATH):
+    """Solves all positions and writes the database to path."""
+    solution = SolutionTable(solve())
+    expecti = ExpectimaxAgent(tt=TranspositionTable(SLOTS))
+
+    buf = bytearray(HEADER.size + SLOTS * RECORD.size)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, RECORD.size, SLOTS)
+    for state in _reachable_states():
+        value, best, dist = solution.lookup(state)
+        moves = 0
+        for a in best:
+            moves |= 1 << a
+        ex_value, ex_action = expecti.expectimax(state.copy(), depth_limit=None, current_depth=0)
+        RECORD.pack_into(buf, HEADER.size + position_index(state) * RECORD.size,
+                         1, value, moves, dist,
+                         -1 if ex_action is None else ex_action, ex_value)
+
+    # write to a temporary file first so readers never map a half-written db
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(buf)
+    os.replace(tmp, path)
+
+
+class PositionDB:
+    """
+    Read-only view of a position database file.
+    Offers the same lookup() as SolutionTable, plus the expectimax values.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, record_size, slots = HEADER.unpack_from(self._mm, 0)
+            if (magic != MAGIC or version != VERSION or record_size != RECORD.size
+                    or slots != SLOTS or len(self._mm) != HEADER.size + slots * record_size):
+                raise ValueError(f"{path} is not a version {VERSION} position database")
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise
+
+    @classmethod
+    def open(cls, path=DEFAULT_PATH, rebuild=True):
+        """Opens path, (re)building it first if it is missing or stale."""
+        try:
+            return cls(path)
+        except (FileNotFoundError, ValueError, struct.error):
+            if not rebuild:
+                raise
+        build(path)
+        return cls(path)
+
+    def close(self):
+        self._mm.close()
+
+    def _record(self, state):
+        if state.geom is not DEFAULT_GEOMETRY:
+            return None
+        rec = RECORD.unpack_from(self._mm, HEADER.size + position_index(state) * RECORD.size)
+        if not rec[0]:
+            return None
+        # the slot ignores the side to move, so reject the wrong one
+        x_count = state.x_mask.bit_count()
+        o_count = state.o_mask.bit_count()
+        if state.to_move != ('X' if x_count == o_count else 'O'):
+            return None
+        return rec
+
+    def lookup(self, state):
+        """(value, best_moves, distance) under perfect play, or None."""
+        rec = self._record(state)
+        if rec is None:
+            return None
+        _, value, moves, dist, _, _ = rec
+        return value, [a for a in range(9) if (moves >> a) & 1], dist
+
+    def expectimax(self, state):
+        """(value, best_action) as computed by ExpectimaxAgent.expectimax, or None."""
+        rec = self._record(state)
+        if rec is None:
+            return None
+        ex_action, ex_value = rec[4], rec[5]
+        return ex_value, (None if ex_action < 0 else ex_action)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped position database.")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="Output file")
+    args = parser.parse_args()
+
+    build(args.out)
+    print(f"Wrote {SLOTS} slots ({HEADER.size + SLOTS * RECORD.size} bytes) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# profiling.py
+#
+# Opt-in profiling of agent moves (--profile in run_game.py and
+# measure_metrics.py). Every get_action runs under cProfile:
+#   - a move slower than the threshold is dumped as a pstats file named
+#     after the agent, board size, depth, game, ply and position key, for
+#     pstats / snakeviz, next to a .txt file with the position, so the
+#     move can be searched again (GameState.from_key);
+#   - all moves are added to one aggregate, reported at the end of the run
+#     as the hottest functions plus the time spent in the game and
+#     evaluation primitives (FOCUS).
+#
+# cProfile charges a fixed cost to every call, so times under --profile are
+# higher than normal and small functions that are called very often look
+# more expensive than they are; compare runs made under --profile with each
+# other. Searches in parallel workers (--workers) are not profiled, only
+# the process that calls get_action.
+
+import cProfile
+import io
+import os
+import pstats
+import time
+
+# (file, function) pairs broken out in the report
+FOCUS = [
+    ("game.py", "generate_successor"),
+    ("game.py", "make_move"),
+    ("game.py", "undo_move"),
+    ("game.py", "winner"),
+    ("game.py", "is_terminal"),
+    ("game.py", "get_legal_actions"),
+    ("evaluation.py", "betterEvaluationFunction"),
+    ("evaluation.py", "value"),             # IncrementalEvaluator, used by the
+    ("evaluation.py", "apply"),             # depth-limited searches instead of
+    ("evaluation.py", "revert"),            # betterEvaluationFunction
+    ("evaluation.py", "evaluate_children"),
+]
+
+
+class MoveProfiler:
+    """
+    threshold_ms  moves at least this slow are dumped to out_dir
+    out_dir       directory for the per-move pstats files
+    """
+
+    def __init__(self, threshold_ms=100.0, out_dir="profiles"):
+        self.threshold_ms = threshold_ms
+        self.out_dir = out_dir
+        self.total = None
+        self.moves = 0
+        self.game = 0
+        self.dumped = []
+
+    def new_game(self):
+        """Call before each game; dumps are numbered by game."""
+        self.game += 1
+
+    def timed_get_action(self, agent, state, depth=None):
+        """agent_base.timed_get_action, with the call profiled."""
+        if agent.stats is not None:
+            agent.stats.reset()
+        profile = cProfile.Profile()
+        t0 = time.perf_counter()
+        profile.enable()
+        try:
+            action = agent.get_action(state, depth)
+        finally:
+            profile.disable()
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.moves += 1
+        if self.total is None:
+            self.total = pstats.Stats(profile)
+        else:
+            self.total.add(profile)
+        if ms >= self.threshold_ms:
+            self._dump(profile, agent, state, depth, ms)
+        return action, ms
+
+    def _dump(self, profile, agent, state, depth, ms):
+        geom = state.geom
+        ply = geom.cells - state.empty_count()
+        key = state.key()
+        depth_text = "full" if depth is None else depth
+        base = (f"{type(agent).__name__}_{geom.rows}x{geom.cols}k{geom.k}_d{depth_text}"
+                f"_g{self.game}_ply{ply}_key{key:x}_{ms:.0f}ms")
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, base + ".prof")
+        profile.dump_stats(path)
+        with open(os.path.join(self.out_dir, base + ".txt"), "w") as f:
+            f.write(f"agent={type(agent).__name__} depth={depth_text} game={self.game} ply={ply} "
+                    f"ms={ms:.3f}\n"
+                    f"rows={geom.rows} cols={geom.cols} k={geom.k} to_move={state.to_move} "
+                    f"key=0x{key:x} (GameState.from_key(int(key, 16), rows, cols, k))\n\n{state}\n")
+        self.dumped.append(path)
+
+    def report(self, top=15):
+        """Text report of the aggregate: focus functions, then the hottest ones."""
+        if self.total is None:
+            return "No moves profiled."
+        stats = self.total.stats
+        total = self.total.total_tt or 1e-12
+        lines = [f"PROFILE: {self.moves} moves, {1000 * self.total.total_tt:.1f} ms profiled"]
+        lines.append(f"  {'function':36s} {'calls':>10s} {'own ms':>10s} {'own %':>6s} {'cum ms':>10s}")
+        focus_own = 0
+        for file, func in FOCUS:
+            calls = own = cum = 0
+            for (path, _, name), (_, nc, tt, ct, _) in stats.items():
+                if name == func and os.path.basename(path) == file:
+                    calls += nc
+                    own += tt
+                    cum += ct
+            focus_own += own
+            lines.append(f"  {file + ':' + func:36s} {calls:10d} {1000 * own:10.1f} "
+                         f"{100 * own / total:5.1f}% {1000 * cum:10.1f}")
+        lines.append(f"  {'all of the above':36s} {'':10s} {1000 * focus_own:10.1f} "
+                     f"{100 * focus_own / total:5.1f}%")
+        out = io.StringIO()
+        self.total.stream = out
+        self.total.sort_stats("tottime").print_stats(top)
+        # drop pstats' own header lines up to the table
+        table = out.getvalue()
+        start = table.find("   ncalls")
+        lines.append(f"\nHottest {top} functions by own time:")
+        lines.append(table[start:].rstrip() if start >= 0 else table.rstrip())
+        if self.dumped:
+            lines.append(f"\n{len(self.dumped)} moves of {self.threshold_ms:g} ms or more dumped to "
+                         f"{self.out_dir}/ (python -m pstats FILE)")
+        return "\n".join(lines)
@@ -1,27 +1,48 @@
 import argparse
 import random
-from game import GameState
+from agent_base import timed_get_action
+from game import GameState, parse_board_size
 from minimax_agent import MinimaxAgent
 from alphabeta_agent import AlphaBetaAgent
 from expectimax_agent import ExpectimaxAgent
+from table_agent import TableAgent
+from negamax_agent import NegamaxAgent, PVSAgent, MTDfAgent
+from mcts_agent import MCTSAgent
+from opening_book import open_book, BookAgent
+from profiling import MoveProfiler
 from evaluation import betterEvaluationFunction
 
 
+def board_lines(s: GameState):
+    """Rows of the board as text, with separator lines between them."""
+    cols = s.geom.cols
+    cells = [c if c is not None else " " for c in s.board]
+    lines = []
+    for r in range(s.geom.rows):
+        if r:
+            lines.append("  " + "-" * (4 * cols - 1))
+        lines.append("   " + " | ".join(cells[r * cols:(r + 1) * cols]) + " ")
+    return lines
+
+
 # ===============================================================
 # STANDARD AGENT vs AGENT PLAY
 # ===============================================================
-def play_game(agentX, agentO, depth_limit=None, verbose=True):
-    """Runs a Tic-Tac-Toe game between two AI agents (X and O)."""
-    state = GameState()
+def play_game(agentX, agentO, depth_limit=None, verbose=True, rows=3, cols=3, k=3, profiler=None):
+    """
+    Runs a Tic-Tac-Toe game between two AI agents (X and O).
+    Agents with stats enabled (agent.enable_stats()) also report the time
+    and search counters of every move. With a profiler (profiling.py) every
+    move is profiled.
+    """
+    state = GameState(rows=rows, cols=cols, k=k)
+    if profiler is not None:
+        profiler.new_game()
+    timed = profiler.timed_get_action if profiler is not None else timed_get_action
 
     def display_board(s: GameState):
-        board = [c if c is not None else " " for c in s.board]
-        print(f"\n   {board[0]} | {board[1]} | {board[2]} ")
-        print("  -----------")
-        print(f"   {board[3]} | {board[4]} | {board[5]} ")
-        print("  -----------")
-        print(f"   {board[6]} | {board[7]} | {board[8]} ")
-        print("   0   1   2   (cell indices)\n")
+        print("\n" + "\n".join(board_lines(s)))
+        print("   " + "   ".join(str(c) for c in range(s.geom.cols)) + "   (cell indices)\n")
 
     agent_x_name = type(agentX).__name__
     agent_o_name = type(agentO).__name__
@@ -32,6 +53,7 @@ def play_game(agentX, agentO, depth_limit=None, verbose=True):
         print("=" * 50)
         print(f"Player X: {agent_x_name}")
         print(f"Player O: {agent_o_name}")
+        print(f"Board: {rows}x{cols}, {k} in a row")
         print(f"Search Depth: {depth_limit if depth_limit else 'Full'}")
         print("\nInitial Board:")
         display_board(state)
@@ -40,7 +62,7 @@ def play_game(agentX, agentO, depth_limit=None, verbose=True):
     while not state.is_terminal():
         current_player = state.to_move
         agent = agentX if current_player == 'X' else agentO
-        action = agent.get_action(state, depth_limit)
+        action, ms = timed(agent, state, depth_limit)
 
         if action is None:
             legal = state.get_legal_actions()
@@ -52,6 +74,8 @@ def play_game(agentX, agentO, depth_limit=None, verbose=True):
         if verbose:
             print(f"\n--- MOVE {move_num} ---")
             print(f"{type(agent).__name__} ({current_player}) chooses cell {action}")
+            if agent.stats is not None:
+                print(f"  time={ms:.3f} ms  {agent.stats}")
             display_board(state)
             move_num += 1
 
@@ -71,35 +95,39 @@ def play_game(agentX, agentO, depth_limit=None, verbose=True):
 # ===============================================================
 # HUMAN vs AI MODE (Randomly chooses who starts)
 # ===============================================================
-def play_human_vs_ai(ai_agent, depth_limit=None):
+def play_human_vs_ai(ai_agent, depth_limit=None, rows=3, cols=3, k=3, profiler=None):
     """
     Human vs AI mode via command line.
     Randomly chooses who starts first (AI or human).
     """
-    state = GameState()
+    state = GameState(rows=rows, cols=cols, k=k)
+    if profiler is not None:
+        profiler.new_game()
+    timed = profiler.timed_get_action if profiler is not None else timed_get_action
+    last_cell = state.geom.cells - 1
+    width = len(str(last_cell))
     human_symbol, ai_symbol = ('O', 'X') if random.choice([True, False]) else ('X', 'O')
     print("\n" + "=" * 50)
     print("          HUMAN vs AI TIC-TAC-TOE")
     print("=" * 50)
     print(f"AI: {type(ai_agent).__name__} ({ai_symbol})")
-    print(f"You are {human_symbol}. Choose positions using numbers 0–8.\n")
-    print("Grid Reference:\n 0 | 1 | 2\n-----------\n 3 | 4 | 5\n-----------\n 6 | 7 | 8\n")
+    print(f"You are {human_symbol}. Choose positions using numbers 0–{last_cell}.\n")
+    grid = [" " + " | ".join(str(r * cols + c).rjust(width) for c in range(cols)) for r in range(rows)]
+    sep = "\n" + "-" * len(grid[0] + " ") + "\n"
+    print("Grid Reference:\n" + sep.join(grid) + "\n")
 
     def display_board(s: GameState):
-        b = [c if c is not None else " " for c in s.board]
-        print(f"\n   {b[0]} | {b[1]} | {b[2]} ")
-        print("  -----------")
-        print(f"   {b[3]} | {b[4]} | {b[5]} ")
-        print("  -----------")
-        print(f"   {b[6]} | {b[7]} | {b[8]} \n")
+        print("\n" + "\n".join(board_lines(s)) + "\n")
 
     # Assign correct symbol to AI
     ai_agent.symbol = ai_symbol
 
     while not state.is_terminal():
         if state.to_move == ai_symbol:
-            action = ai_agent.get_action(state, depth_limit)
+            action, ms = timed(ai_agent, state, depth_limit)
             print(f"AI ({type(ai_agent).__name__}) chooses cell {action}")
+            if ai_agent.stats is not None:
+                print(f"  time={ms:.3f} ms  {ai_agent.stats}")
         else:
             legal = state.get_legal_actions()
             while True:
@@ -110,7 +138,7 @@ def play_human_vs_ai(ai_agent, depth_limit=None):
                         break
                     print("Invalid move. Cell occupied or out of range.")
                 except ValueError:
-                    print("Please enter a number between 0 and 8.")
+                    print(f"Please enter a number between 0 and {last_cell}.")
         state = state.generate_successor(action)
         display_board(state)
 
@@ -139,46 +167,169 @@ def main():
 Examples:
   python run_game.py -p AlphaBetaAgent --opp MinimaxAgent
   python run_game.py --depth 3
+  python run_game.py --time-ms 5
+  python run_game.py --size 4 --k 3 --depth 3
   python run_game.py --human AlphaBetaAgent
+  python run_game.py -p TableAgent --opp AlphaBetaAgent
+  python run_game.py -p PVSAgent --opp MTDfAgent --size 4 --depth 4
+  python run_game.py -p MCTSAgent --opp AlphaBetaAgent --size 7 --k 5 --time-ms 500 --depth 2
         """
     )
     parser.add_argument(
         "-p", "--player",
         default="AlphaBetaAgent",
-        choices=["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent"],
+        choices=["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent", "TableAgent",
+                 "NegamaxAgent", "PVSAgent", "MTDfAgent", "MCTSAgent"],
         help="Algorithm for Player X (default: AlphaBetaAgent)"
     )
     parser.add_argument(
         "--opp", "--opponent",
         default="ExpectimaxAgent",
-        choices=["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent"],
+        choices=["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent", "TableAgent",
+                 "NegamaxAgent", "PVSAgent", "MTDfAgent", "MCTSAgent"],
         help="Algorithm for Player O (default: ExpectimaxAgent)"
     )
     parser.add_argument(
         "--depth", type=int, default=None,
         help="Maximum search depth (default: unlimited)"
     )
+    parser.add_argument(
+        "--size", type=parse_board_size, default=(3, 3),
+        help="Board size, N or ROWSxCOLS (default: 3)"
+    )
+    parser.add_argument(
+        "--k", type=int, default=None,
+        help="Marks in a row needed to win (default: the board's shorter side)"
+    )
+    parser.add_argument(
+        "--time-ms", type=float, default=None,
+        help="Per-move time budget for AlphaBetaAgent (iterative deepening) and MCTSAgent"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=1000,
+        help="MCTSAgent iterations per move when --time-ms is not set (default: 1000)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Search root moves of AlphaBetaAgent/ExpectimaxAgent in N processes "
+             "(AlphaBetaAgent: not with --time-ms)"
+    )
+    parser.add_argument(
+        "--batch-eval", action="store_true",
+        help="AlphaBetaAgent scores all children at the depth limit in one batch (large boards, NumPy)"
+    )
+    parser.add_argument(
+        "--memo", action="store_true",
+        help="ExpectimaxAgent caches values by position and remaining depth"
+    )
+    parser.add_argument(
+        "--prune", action="store_true",
+        help="Star1 pruning of ExpectimaxAgent chance nodes (full-depth searches)"
+    )
+    parser.add_argument(
+        "--policy", default="uniform", choices=["uniform", "softmax"],
+        help="How ExpectimaxAgent expects O to move (default: uniform)"
+    )
+    parser.add_argument(
+        "--temperature", type=float, default=1.0,
+        help="Temperature of the softmax policy (default: 1.0)"
+    )
+    parser.add_argument(
+        "--endgame", type=int, default=None,
+        help="Hybrid mode: solve positions at the depth limit with at most N empty cells exactly "
+             "(MinimaxAgent then honors --depth too)"
+    )
+    parser.add_argument(
+        "--extend", action="store_true",
+        help="Hybrid mode: search forcing positions (a win to take or block) one ply further"
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="Print search time, nodes, cutoffs and table hits for every AI move"
+    )
     parser.add_argument(
         "--human", type=str, default=None,
-        choices=["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent"],
+        choices=["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent", "TableAgent",
+                 "NegamaxAgent", "PVSAgent", "MTDfAgent", "MCTSAgent"],
         help="Play against a chosen AI (AI plays as X or O, random start)"
     )
+    parser.add_argument(
+        "--table", default="solution_table.bin",
+        help="Solution table file for TableAgent (built if missing)"
+    )
+    parser.add_argument(
+        "--db", default=None,
+        help="Memory-mapped position database for TableAgent, used instead of --table (built if missing or stale)"
+    )
+    parser.add_argument(
+        "--table-values", default="minimax", choices=["minimax", "expectimax"],
+        help="Which stored values TableAgent plays by (expectimax needs --db)"
+    )
+    parser.add_argument(
+        "--book", default=None,
+        help="Comma-separated opening books (opening_book.py); each agent plays from its own"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile every AI move and print a hot-function report after the game"
+    )
+    parser.add_argument(
+        "--profile-threshold-ms", type=float, default=100.0,
+        help="With --profile, dump moves at least this slow to --profile-dir as pstats files"
+    )
+    parser.add_argument(
+        "--profile-dir", default="profiles",
+        help="Directory for the pstats files of slow moves"
+    )
 
     args = parser.parse_args()
+    if (args.time_ms is not None and args.workers and args.workers > 1
+            and "AlphaBetaAgent" in (args.human, args.player, args.opp)):
+        parser.error("AlphaBetaAgent takes --time-ms or --workers, not both")
+    rows, cols = args.size
+    k = args.k if args.k is not None else min(rows, cols)
 
     agent_map = {
-        "MinimaxAgent": MinimaxAgent(),
-        "AlphaBetaAgent": AlphaBetaAgent(),
-        "ExpectimaxAgent": ExpectimaxAgent(),
+        "MinimaxAgent": lambda: MinimaxAgent(endgame=args.endgame, extend=args.extend),
+        "AlphaBetaAgent": lambda: AlphaBetaAgent(time_ms=args.time_ms, workers=args.workers,
+                                                 batch_eval=args.batch_eval,
+                                                 endgame=args.endgame, extend=args.extend),
+        "ExpectimaxAgent": lambda: ExpectimaxAgent(workers=args.workers, memo=args.memo, prune=args.prune,
+                                                   policy=args.policy, temperature=args.temperature,
+                                                   endgame=args.endgame, extend=args.extend),
+        "TableAgent": lambda: TableAgent(args.table, db=args.db, values=args.table_values),
+        "NegamaxAgent": lambda: NegamaxAgent(endgame=args.endgame, extend=args.extend),
+        "PVSAgent": lambda: PVSAgent(endgame=args.endgame, extend=args.extend),
+        "MTDfAgent": lambda: MTDfAgent(endgame=args.endgame, extend=args.extend),
+        "MCTSAgent": lambda: MCTSAgent(iterations=args.iterations, time_ms=args.time_ms),
     }
 
+    books = [open_book(path) for path in args.book.split(",")] if args.book else []
+
+    def make(name):
+        agent = agent_map[name]()
+        for book in books:
+            if book.agent == name:
+                return BookAgent(agent, book)
+        return agent
+
+    profiler = MoveProfiler(args.profile_threshold_ms, args.profile_dir) if args.profile else None
+
     if args.human:
-        ai_agent = agent_map[args.human]
-        play_human_vs_ai(ai_agent, depth_limit=args.depth)
+        ai_agent = make(args.human)
+        if args.stats:
+            ai_agent.enable_stats()
+        play_human_vs_ai(ai_agent, depth_limit=args.depth, rows=rows, cols=cols, k=k, profiler=profiler)
     else:
-        agentX = agent_map[args.player]
-        agentO = agent_map[args.opp]
-        play_game(agentX, agentO, depth_limit=args.depth, verbose=True)
+        agentX = make(args.player)
+        agentO = make(args.opp)
+        if args.stats:
+            agentX.enable_stats()
+            agentO.enable_stats()
+        play_game(agentX, agentO, depth_limit=args.depth, verbose=True, rows=rows, cols=cols, k=k,
+                  profiler=profiler)
+    if profiler is not None:
+        print(profiler.report())
 
 
 if __name__ == "__main__":
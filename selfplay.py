@@ -0,0 +1,336 @@
+# selfplay.py
+#
+# Self-play dataset generator. Agent pairs play games in a process pool and
+# every searched position becomes one fixed-width binary record, so millions
+# of positions are written without text formatting and read back with one
+# struct.iter_unpack (read_records) or memory-mapped with NumPy (load_array).
+#
+# Each worker packs the records of a batch of games into one bytes chunk;
+# the parent only writes chunks, and at most two batches per worker are in
+# flight, so memory stays flat. The one exception is --dedup, which skips
+# repeated positions: it must remember every distinct position written.
+# With NumPy these are kept as a sorted array of fixed-width keys (KeySet,
+# 3 bytes a position on 3x3, 7 on 5x5); without it, as a set of ints
+# (around 100 bytes a position).
+#
+# With --epsilon the searched move is replaced by a random one with that
+# probability, to spread the games over more positions. The record still
+# holds the agent's move and value; "played" is the move actually made.
+#
+# Layout (little endian):
+#   header  magic "TTSP", version, rows, cols, k, record size
+#   records RECORD, one per position an agent searched
+#
+# Usage:
+#   python selfplay.py --pairs AlphaBetaAgent:ExpectimaxAgent --games 1000 --epsilon 0.1 \
+#       --out selfplay.bin
+#   python selfplay.py --pairs MCTSAgent:AlphaBetaAgent,AlphaBetaAgent:MCTSAgent --size 5 --k 4 \
+#       --depth 2 --games 200 --dedup --jobs 8
+
+import argparse
+import itertools
+import math
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from agent_base import timed_get_action
+from game import GameState, parse_board_size
+from measure_metrics import make_agent
+from symmetry import canonical_key
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"TTSP"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBBH")    # magic, version, rows, cols, k, record size
+# x mask, o mask, game, ply, side to move (0 = X, 1 = O), agent's move,
+# played move, final outcome for X (1 / 0 / -1), agent's value for X (NaN if
+# none), nodes searched, search time in ms
+RECORD = struct.Struct("<QQIBBBBbfIf")
+FIELDS = ("x_mask", "o_mask", "game", "ply", "to_move", "move", "played", "outcome",
+          "value", "nodes", "ms")
+
+if np is not None:
+    DTYPE = np.dtype([("x_mask", "<u8"), ("o_mask", "<u8"), ("game", "<u4"), ("ply", "u1"),
+                      ("to_move", "u1"), ("move", "u1"), ("played", "u1"), ("outcome", "i1"),
+                      ("value", "<f4"), ("nodes", "<u4"), ("ms", "<f4")])
+
+MAX_CELLS = 64
+DEFAULT_PATH = "selfplay.bin"
+
+# worker process globals
+_config = None
+
+
+def _init_worker(config):
+    global _config
+    _config = config
+
+
+def play_game(agentX, agentO, game, seed, depth=None, rows=3, cols=3, k=3, epsilon=0.0):
+    """
+    Plays one game and returns (records, outcome): one RECORD tuple per move.
+    """
+    state = GameState(rows=rows, cols=cols, k=k)
+    rng = random.Random(seed)
+    moves = []
+    while not state.is_terminal():
+        agent = agentX if state.to_move == 'X' else agentO
+        action, ms = timed_get_action(agent, state, depth)
+        played = action
+        if epsilon and rng.random() < epsilon:
+            played = rng.choice(state.get_legal_actions())
+        value = agent.last_value
+        moves.append((state.x_mask, state.o_mask, game, len(moves), state.to_move == 'O',
+                      action, played, math.nan if value is None else value,
+                      agent.stats.nodes, ms))
+        state.make_move(played)
+    outcome = state.utility()
+    return [m[:7] + (outcome,) + m[7:] for m in moves], outcome
+
+
+def _play_batch(batch):
+    """Plays a batch of (game, x, o, seed) and returns (chunk, keys, outcomes)."""
+    c = _config
+    cells = c["rows"] * c["cols"]
+    pack = RECORD.pack
+    chunk = bytearray()
+    keys = [] if c["dedup"] else None
+    outcomes = []
+    for game, x, o, seed in batch:
+        # seeds of their own for both agents (MCTSAgent), from the game's
+        agentX = make_agent(x, **c["agent_options"], seed=2 * seed)
+        agentO = make_agent(o, **c["agent_options"], seed=2 * seed + 1)
+        records, outcome = play_game(agentX, agentO, game, seed, c["depth"],
+                                     c["rows"], c["cols"], c["k"], c["epsilon"])
+        for record in records:
+            chunk += pack(*record)
+        if keys is not None:
+            for x_mask, o_mask, _, _, side, *_ in records:
+                key = x_mask | (o_mask << cells) | (side << (2 * cells))
+                keys.append(canonical_key(GameState.from_key(key, c["rows"], c["cols"], c["k"])))
+        outcomes.append(outcome)
+    return bytes(chunk), keys, outcomes
+
+
+def schedule(pairs, games, seed=0):
+    """(game, x, o, seed) for games games of every pair, lazily."""
+    for i, ((x, o), _) in enumerate(itertools.product(pairs, range(games))):
+        yield i, x, o, seed + i
+
+
+class KeySet:
+    """
+    Set of position keys of one board size, kept compact: keys are stored
+    as big-endian byte strings in a sorted NumPy array, with the most recent
+    ones in a small set that is merged into the array every merge_every keys.
+    Supports `in`, add and len, like the set it stands in for.
+    """
+
+    def __init__(self, cells, merge_every=1 << 16):
+        # both masks and the side to move
+        self.width = (2 * cells + 8) // 8
+        self.merge_every = merge_every
+        self.keys = np.empty(0, dtype=f"S{self.width}")
+        self.recent = set()
+
+    def __contains__(self, key):
+        if key in self.recent:
+            return True
+        keys = self.keys
+        b = key.to_bytes(self.width, "big")
+        i = keys.searchsorted(b)
+        # numpy hands back S items without their trailing zero bytes
+        return i < len(keys) and keys[i] == b.rstrip(b"\0")
+
+    def add(self, key):
+        self.recent.add(key)
+        if len(self.recent) >= self.merge_every:
+            self._merge()
+
+    def _merge(self):
+        new = np.array(sorted(k.to_bytes(self.width, "big") for k in self.recent),
+                       dtype=self.keys.dtype)
+        # callers only add keys that are not in the array yet
+        self.keys = np.insert(self.keys, self.keys.searchsorted(new), new)
+        self.recent.clear()
+
+    def __len__(self):
+        return len(self.keys) + len(self.recent)
+
+
+class RecordFile:
+    """Appends chunks of packed records to a self-play file."""
+
+    def __init__(self, path, rows, cols, k, dedup=False):
+        self.f = open(path, "wb")
+        self.f.write(HEADER.pack(MAGIC, VERSION, rows, cols, k, RECORD.size))
+        self.seen = None
+        if dedup:
+            self.seen = KeySet(rows * cols) if np is not None else set()
+        self.records = 0
+        self.skipped = 0
+
+    def write(self, chunk, keys=None):
+        if self.seen is None or keys is None:
+            self.f.write(chunk)
+            self.records += len(chunk) // RECORD.size
+            return
+        size = RECORD.size
+        view = memoryview(chunk)
+        seen = self.seen
+        for i, key in enumerate(keys):
+            if key in seen:
+                self.skipped += 1
+                continue
+            seen.add(key)
+            self.f.write(view[i * size:(i + 1) * size])
+            self.records += 1
+
+    def close(self):
+        self.f.close()
+
+
+def read_header(f):
+    magic, version, rows, cols, k, size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError(f"not a version {VERSION} self-play file")
+    return rows, cols, k
+
+
+def read_records(path, chunk_records=65536):
+    """Yields the records of a self-play file as RECORD tuples, chunk by chunk."""
+    with open(path, "rb") as f:
+        read_header(f)
+        while True:
+            data = f.read(chunk_records * RECORD.size)
+            if not data:
+                return
+            yield from RECORD.iter_unpack(data)
+
+
+def load_array(path):
+    """All records as a NumPy structured array (fields FIELDS), memory-mapped."""
+    if np is None:
+        raise ImportError("load_array needs NumPy; use read_records instead")
+    with open(path, "rb") as f:
+        read_header(f)
+    return np.memmap(path, dtype=DTYPE, mode="r", offset=HEADER.size)
+
+
+def generate(games, config, out, jobs=None, batch_size=16):
+    """Plays the games of the schedule into the file out; returns (RecordFile, results)."""
+    writer = RecordFile(out, config["rows"], config["cols"], config["k"], config["dedup"])
+    results = {1: 0, 0: 0, -1: 0}
+
+    def consume(result):
+        chunk, keys, outcomes = result
+        writer.write(chunk, keys)
+        for outcome in outcomes:
+            results[outcome] += 1
+
+    def batches():
+        it = iter(games)
+        while True:
+            batch = list(itertools.islice(it, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    try:
+        if jobs == 1:
+            _init_worker(config)
+            for batch in batches():
+                consume(_play_batch(batch))
+            return writer, results
+
+        jobs = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(config,)) as executor:
+            todo = batches()
+            pending = {executor.submit(_play_batch, b) for b in itertools.islice(todo, 2 * jobs)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    consume(future.result())
+                    batch = next(todo, None)
+                    if batch is not None:
+                        pending.add(executor.submit(_play_batch, batch))
+        return writer, results
+    finally:
+        writer.close()
+
+
+def parse_pairs(text):
+    """"A:B,C:D" -> [("A", "B"), ("C", "D")]; a lone "A" plays itself."""
+    pairs = []
+    for item in text.split(","):
+        x, _, o = item.partition(":")
+        pairs.append((x, o or x))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play positions in a binary file.")
+    parser.add_argument("--pairs", type=parse_pairs, default=[("AlphaBetaAgent", "ExpectimaxAgent")],
+                        help="Comma-separated X:O agent pairs (default: AlphaBetaAgent:ExpectimaxAgent)")
+    parser.add_argument("--games", type=int, default=100, help="Games per pair")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game "
+                        "(MCTSAgent games repeat with --iterations, not with --time-ms)")
+    parser.add_argument("--epsilon", type=float, default=0.0,
+                        help="Probability of playing a random move instead of the agent's")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Write each position (up to symmetry) only once")
+    parser.add_argument("--depth", type=int, default=None, help="Search depth (default: full)")
+    parser.add_argument("--size", type=parse_board_size, default=(3, 3),
+                        help="Board size, N or RxC (default: 3)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="Marks in a row needed to win (default: shorter side)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Worker processes (default: all CPUs, 1 = no pool)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Games per pool task")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="Output file")
+    parser.add_argument("--tt-size", type=int, default=None,
+                        help="Transposition table entries per agent")
+    parser.add_argument("--time-ms", type=float, default=None,
+                        help="Per-move time budget for AlphaBetaAgent and MCTSAgent")
+    parser.add_argument("--iterations", type=int, default=1000, help="MCTSAgent iterations per move")
+    parser.add_argument("--endgame", type=int, default=None,
+                        help="Hybrid mode: solve positions at the depth limit with at most N empty cells")
+    parser.add_argument("--extend", action="store_true",
+                        help="Hybrid mode: search forcing positions one ply further")
+    parser.add_argument("--book", default=None,
+                        help="Comma-separated opening books; each agent plays from its own")
+    args = parser.parse_args()
+    rows, cols = args.size
+    if rows * cols > MAX_CELLS:
+        parser.error(f"boards of more than {MAX_CELLS} cells do not fit a record")
+
+    config = {
+        "rows": rows, "cols": cols, "k": args.k if args.k is not None else min(rows, cols),
+        "depth": args.depth, "epsilon": args.epsilon, "dedup": args.dedup,
+        "agent_options": {
+            "tt_size": args.tt_size, "time_ms": args.time_ms, "iterations": args.iterations,
+            "books": tuple(args.book.split(",")) if args.book else (),
+            "endgame": args.endgame, "extend": args.extend,
+        },
+    }
+    t0 = time.perf_counter()
+    writer, results = generate(schedule(args.pairs, args.games, args.seed), config, args.out,
+                               args.jobs, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    print(f"Wrote {writer.records} records ({writer.records * RECORD.size + HEADER.size} bytes) "
+          f"to {args.out} in {elapsed:.1f} s")
+    if args.dedup:
+        print(f"Skipped {writer.skipped} repeated positions")
+    print(f"Results: X wins {results[1]}, draws {results[0]}, O wins {results[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+# server.py
+#
+# Line-based game server: many human-vs-AI games at once in one process.
+# Every connection is one session with its own board and sides; searches
+# run in a bounded process pool so the event loop never waits on them.
+#
+# Protocol (one command per line, one reply line per command):
+#   NEW [agent=NAME] [size=N|RxC] [k=K] [depth=D] [side=X|O|random]
+#       -> GAME you=X board=......... [ai=CELL] [result=...]
+#   MOVE CELL
+#       -> MOVE board=... [ai=CELL] [result=X|O|draw]
+#   BOARD       -> BOARD board=... turn=X
+#   STATS       -> STATS {json}
+#   QUIT        -> BYE
+# Boards over 3x3 need a depth (except with MCTSAgent): full search there
+# would hold a worker for hours. For the same reason their depth is capped
+# (--max-depth, default 4). Errors are "ERR message". When too many
+# searches are already queued the server answers "BUSY" and leaves the
+# board unchanged, so the client can retry the same command later.
+#
+# Usage:
+#   python server.py --port 7777 --workers 4           # serve
+#   python server.py --port 7777 --clients 500         # load test a server
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game import GameState, parse_board_size
+from measure_metrics import make_agent
+from online_stats import RunningStats, LogHistogram
+
+AGENTS = ["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent", "TableAgent",
+          "NegamaxAgent", "PVSAgent", "MTDfAgent", "MCTSAgent"]
+MAX_LINE = 1024
+# largest board searched to the end (depth=None): 3x3. Larger boards need a
+# depth, so that one session cannot hold a worker for hours; MCTSAgent is
+# bounded by its iterations and exempt
+MAX_FULL_SEARCH_CELLS = 9
+# default cap on the depth a session can ask for on those larger boards
+MAX_DEPTH = 4
+
+# worker process globals: one agent per agent name and worker. A worker runs
+# one search at a time, and every agent answers from the position it is
+# given, so sessions can share them.
+_agents = {}
+_agent_options = {}
+
+
+def _init_worker(agent_options):
+    global _agent_options
+    _agent_options = agent_options
+
+
+def _search(agent_name, key, rows, cols, k, depth):
+    agent = _agents.get(agent_name)
+    if agent is None:
+        agent = _agents[agent_name] = make_agent(agent_name, **_agent_options)
+    state = GameState.from_key(key, rows, cols, k)
+    t0 = time.perf_counter()
+    action = agent.get_action(state, depth)
+    return action, (time.perf_counter() - t0) * 1000.0
+
+
+def board_text(state):
+    return "".join(c or "." for c in state.board)
+
+
+def result_text(state):
+    winner = state.winner()
+    return "draw" if winner is None else winner
+
+
+class Latency:
+    """Mean and p50/p95/p99 of a stream of durations in ms."""
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.hist = LogHistogram()
+
+    def add(self, ms):
+        self.stats.add(ms)
+        self.hist.add(ms)
+
+    def as_dict(self):
+        return {"n": self.stats.n, "mean": round(self.stats.mean, 3),
+                "p50": round(self.hist.quantile(0.50), 3), "p95": round(self.hist.quantile(0.95), 3),
+                "p99": round(self.hist.quantile(0.99), 3),
+                "max": round(self.stats.max, 3) if self.stats.n else 0.0}
+
+
+class Session:
+    """One client's game: nothing in it is shared with other sessions."""
+
+    __slots__ = ("state", "human", "ai", "agent", "depth", "rng")
+
+    def __init__(self, seed=None):
+        self.state = None
+        self.human = self.ai = None
+        self.agent = None
+        self.depth = None
+        self.rng = random.Random(seed)
+
+
+class GameServer:
+    """
+    workers       processes searching AI moves
+    max_pending   searches submitted to the pool at once; more wait their turn
+    max_queue     searches allowed to wait; beyond that requests get BUSY
+    max_sessions  open connections; beyond that new ones are refused
+    max_depth     deepest search allowed on boards over MAX_FULL_SEARCH_CELLS
+    """
+
+    def __init__(self, workers=4, max_pending=None, max_queue=1000, max_sessions=10000,
+                 agent="AlphaBetaAgent", depth=None, agent_options=None, max_depth=MAX_DEPTH):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(agent_options or {},))
+        self.max_pending = max_pending or 2 * workers
+        self.max_queue = max_queue
+        self.max_sessions = max_sessions
+        self.default_agent = agent
+        self.default_depth = depth
+        self.max_depth = max_depth
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self.waiting = 0
+        self.running = 0
+        self.sessions = 0
+        self.sessions_total = 0
+        self.busy = 0
+        self.errors = 0
+        self.latency = {}           # command -> Latency of the whole request
+        self.search_ms = Latency()  # time inside get_action
+        self.queue_ms = Latency()   # time waiting for a pool slot
+
+    async def handle(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            writer.write(b"ERR server full\n")
+            await writer.drain()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            return
+        self.sessions += 1
+        self.sessions_total += 1
+        session = Session()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than MAX_LINE
+                    writer.write(b"ERR line too long\n")
+                    break
+                if not line:
+                    break
+                t0 = time.perf_counter()
+                parts = line.decode("ascii", "replace").split()
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                if command == "QUIT":
+                    writer.write(b"BYE\n")
+                    break
+                try:
+                    reply = await self.dispatch(session, command, parts[1:])
+                except ValueError as e:
+                    self.errors += 1
+                    reply = f"ERR {e}"
+                writer.write(reply.encode() + b"\n")
+                # slow readers hold their own session back, not the server
+                await writer.drain()
+                latency = self.latency.get(command)
+                if latency is None:
+                    latency = self.latency[command] = Latency()
+                latency.add((time.perf_counter() - t0) * 1000.0)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, session, command, args):
+        if command == "NEW":
+            return await self.new_game(session, args)
+        if command == "MOVE":
+            return await self.move(session, args)
+        if command == "BOARD":
+            if session.state is None:
+                raise ValueError("no game, send NEW first")
+            return f"BOARD board={board_text(session.state)} turn={session.state.to_move}"
+        if command == "STATS":
+            return "STATS " + json.dumps(self.stats())
+        raise ValueError(f"unknown command {command}")
+
+    async def new_game(self, session, args):
+        options = {}
+        for arg in args:
+            name, sep, value = arg.partition("=")
+            if not sep:
+                raise ValueError(f"expected name=value, got {arg}")
+            options[name.lower()] = value
+        agent = options.get("agent", self.default_agent)
+        if agent not in AGENTS:
+            raise ValueError(f"unknown agent {agent}")
+        try:
+            rows, cols = parse_board_size(options.get("size", "3"))
+            k = int(options.get("k", min(rows, cols)))
+            depth = options.get("depth")
+            depth = int(depth) if depth is not None else self.default_depth
+        except (TypeError, ValueError):
+            raise ValueError("bad size, k or depth")
+        if not (1 <= rows <= 10 and 1 <= cols <= 10 and 1 <= k <= max(rows, cols)):
+            raise ValueError("size must be at most 10x10 and k at most the longer side")
+        if depth is None and rows * cols > MAX_FULL_SEARCH_CELLS and agent != "MCTSAgent":
+            raise ValueError(f"boards over {MAX_FULL_SEARCH_CELLS} cells need depth=D")
+        if depth is not None and depth < 1:
+            raise ValueError("depth must be at least 1")
+        if depth is not None and depth > self.max_depth and rows * cols > MAX_FULL_SEARCH_CELLS:
+            raise ValueError(f"depth must be at most {self.max_depth} on boards over "
+                             f"{MAX_FULL_SEARCH_CELLS} cells")
+        side = options.get("side", "random").upper()
+        if side == "RANDOM":
+            side = session.rng.choice("XO")
+        if side not in ("X", "O"):
+            raise ValueError("side must be X, O or random")
+        # only a game where the AI opens queues a search
+        if side == "O" and self.overloaded():
+            self.busy += 1
+            return "BUSY"
+
+        session.state = GameState(rows=rows, cols=cols, k=k)
+        session.human, session.ai = side, ("O" if side == "X" else "X")
+        session.agent, session.depth = agent, depth
+        ai = await self.ai_move(session) if session.ai == "X" else ""
+        return f"GAME you={side} board={board_text(session.state)}" + ai
+
+    async def move(self, session, args):
+        state = session.state
+        if state is None:
+            raise ValueError("no game, send NEW first")
+        if state.is_terminal():
+            raise ValueError(f"game over, result={result_text(state)}")
+        if len(args) != 1 or not args[0].isdigit():
+            raise ValueError("usage: MOVE CELL")
+        cell = int(args[0])
+        if cell not in state.get_legal_actions():
+            raise ValueError(f"illegal move {cell}")
+        state.make_move(cell)
+        # only a move that leaves the game open queues a search; if it
+        # cannot, take the move back so the client can retry it
+        if not state.is_terminal() and self.overloaded():
+            state.undo_move(cell)
+            self.busy += 1
+            return "BUSY"
+        ai = "" if state.is_terminal() else await self.ai_move(session)
+        reply = f"MOVE board={board_text(state)}" + ai
+        if state.is_terminal() and not ai:
+            reply += f" result={result_text(state)}"
+        return reply
+
+    def overloaded(self):
+        return self.waiting >= self.max_queue
+
+    async def ai_move(self, session):
+        """Searches the AI's move in the pool and plays it; returns the reply suffix."""
+        state = session.state
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.queue_ms.add((time.perf_counter() - t0) * 1000.0)
+        self.running += 1
+        try:
+            geom = state.geom
+            action, ms = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _search, session.agent, state.key(),
+                geom.rows, geom.cols, geom.k, session.depth)
+        finally:
+            self.running -= 1
+            self._slots.release()
+        self.search_ms.add(ms)
+        if action is None:
+            action = state.get_legal_actions()[0]
+        state.make_move(action)
+        reply = f" ai={action}"
+        if state.is_terminal():
+            reply += f" result={result_text(state)}"
+        return reply
+
+    def stats(self):
+        return {
+            "sessions": self.sessions, "sessions_total": self.sessions_total,
+            "searching": self.running, "waiting": self.waiting,
+            "busy": self.busy, "errors": self.errors,
+            "search_ms": self.search_ms.as_dict(), "queue_ms": self.queue_ms.as_dict(),
+            "latency_ms": {c: l.as_dict() for c, l in sorted(self.latency.items())},
+        }
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def serve(server, host="127.0.0.1", port=7777, unix=None):
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix, limit=MAX_LINE)
+        print(f"Serving on unix socket {unix}")
+    else:
+        listener = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE,
+                                              backlog=1024)
+        print(f"Serving on {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+# ---------------------------------------------------------------
+# LOAD-TEST CLIENT
+# ---------------------------------------------------------------
+async def _client(host, port, unix, games, new_args, seed, latency, results):
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+
+    async def request(line):
+        while True:
+            t0 = time.perf_counter()
+            writer.write(line.encode() + b"\n")
+            await writer.drain()
+            reply = (await reader.readline()).decode().split()
+            latency.add((time.perf_counter() - t0) * 1000.0)
+            if not reply or reply[0] == "ERR":
+                raise RuntimeError(f"{line!r}: {' '.join(reply) or 'connection closed'}")
+            if reply[0] != "BUSY":
+                return dict(p.split("=", 1) for p in reply[1:] if "=" in p)
+            await asyncio.sleep(0.01)
+
+    try:
+        for _ in range(games):
+            reply = await request("NEW " + new_args)
+            while "result" not in reply:
+                empty = [i for i, c in enumerate(reply["board"]) if c == "."]
+                reply = await request(f"MOVE {rng.choice(empty)}")
+            results[reply["result"]] = results.get(reply["result"], 0) + 1
+        writer.write(b"QUIT\n")
+        await writer.drain()
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def load_test(clients, games, host="127.0.0.1", port=7777, unix=None, new_args=""):
+    """clients concurrent connections playing random moves; prints latency."""
+    latency = Latency()
+    results = {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, unix, games, new_args, i, latency, results)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - t0
+    print(f"{clients} clients x {games} games in {elapsed:.1f} s "
+          f"({latency.stats.n / elapsed:.0f} requests/s), results {results}")
+    print("request latency (ms):", json.dumps(latency.as_dict()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve human-vs-AI games over a line protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--unix", default=None, help="Listen on (or connect to) this Unix socket instead")
+    parser.add_argument("--workers", type=int, default=4, help="Search processes")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Searches in the pool at once (default: 2 per worker)")
+    parser.add_argument("--max-queue", type=int, default=1000,
+                        help="Searches allowed to wait before requests get BUSY")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="Open connections allowed")
+    parser.add_argument("--agent", default="AlphaBetaAgent", choices=AGENTS,
+                        help="AI for sessions that do not pick one")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="Search depth for sessions that do not pick one (default: full, "
+                             "3x3 boards only)")
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH,
+                        help=f"Deepest search a session may ask for on boards over 3x3 "
+                             f"(default: {MAX_DEPTH})")
+    parser.add_argument("--tt-size", type=int, default=None,
+                        help="Transposition table entries per agent and worker")
+    parser.add_argument("--book", default=None,
+                        help="Comma-separated opening books; each agent plays from its own")
+    parser.add_argument("--clients", type=int, default=None,
+                        help="Instead of serving, load test a running server with N clients")
+    parser.add_argument("--games", type=int, default=1, help="Games per load-test client")
+    parser.add_argument("--new", default="", help="NEW arguments the load-test clients send")
+    args = parser.parse_args()
+
+    if args.clients:
+        asyncio.run(load_test(args.clients, args.games, args.host, args.port, args.unix, args.new))
+        return
+
+    if args.depth is not None and args.depth > args.max_depth:
+        parser.error("--depth cannot be above --max-depth")
+    server = GameServer(args.workers, args.max_pending, args.max_queue, args.max_sessions,
+                        args.agent, args.depth,
+                        {"tt_size": args.tt_size, "books": args.book.split(",") if args.book else ()},
+                        args.max_depth)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("STATS " + json.dumps(server.stats()))
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
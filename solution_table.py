@@ -0,0 +1,142 @@
+# solution_table.py
+#
+# Solves every reachable 3x3 Tic-Tac-Toe position once by backward (retrograde)
+# analysis and stores the result in a small binary file.
+#
+# Positions are stored under their symmetry-canonical key, so the 5,478
+# reachable positions shrink to 765 records. Each record holds
+#   value     game value for X (+1, 0, -1) under perfect play
+#   moves     bit mask of all best moves, in canonical orientation
+#   distance  number of plies to the end of the game under perfect play
+#
+# Usage:
+#   python solution_table.py --out solution_table.bin
+
+import argparse
+import struct
+
+from game import GameState, DEFAULT_GEOMETRY
+from symmetry import canonical, from_canonical_action
+
+MAGIC = b"TTTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")     # magic, version, record count
+RECORD = struct.Struct("<IbHB")     # key, value, best-move mask, distance
+
+DEFAULT_PATH = "solution_table.bin"
+
+
+def solve():
+    """
+    Returns {canonical key: (value, moves_mask, distance)} for every position
+    reachable from the empty board.
+    """
+    # 1) forward pass: collect the reachable positions ply by ply
+    layers = [[canonical(GameState())[0]]]
+    for _ in range(9):
+        seen = set()
+        for key in layers[-1]:
+            state = GameState.from_key(key)
+            if state.is_terminal():
+                continue
+            for a in state.get_legal_actions():
+                state.make_move(a)
+                seen.add(canonical(state)[0])
+                state.undo_move(a)
+        if not seen:
+            break
+        layers.append(sorted(seen))
+
+    # 2) backward pass: every child of a ply-n position sits on ply n+1,
+    #    so solving the layers from the last one back needs no recursion
+    table = {}
+    for layer in reversed(layers):
+        for key in layer:
+            state = GameState.from_key(key)
+            if state.is_terminal():
+                table[key] = (state.utility(), 0, 0)
+                continue
+            sign = 1 if state.to_move == 'X' else -1
+            best_rank, moves, best_dist = None, 0, 0
+            for a in state.get_legal_actions():
+                state.make_move(a)
+                value, _, dist = table[canonical(state)[0]]
+                state.undo_move(a)
+                # win as fast as possible, lose (or draw) as slowly as possible
+                mine = sign * value
+                rank = (mine, -dist if mine > 0 else dist)
+                if best_rank is None or rank > best_rank:
+                    best_rank, moves, best_dist = rank, 1 << a, dist
+                elif rank == best_rank:
+                    moves |= 1 << a
+            table[key] = (sign * best_rank[0], moves, best_dist + 1)
+    return table
+
+
+def save(table, path=DEFAULT_PATH):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(table)))
+        for key in sorted(table):
+            value, moves, dist = table[key]
+            f.write(RECORD.pack(key, value, moves, dist))
+
+
+def load(path=DEFAULT_PATH):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} solution table")
+    table = {}
+    for key, value, moves, dist in RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size]):
+        table[key] = (value, moves, dist)
+    return table
+
+
+class SolutionTable:
+    """In-memory solution table answering lookups for any board orientation."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_PATH, build_missing=True):
+        """Loads path, solving and writing it first if it does not exist yet."""
+        try:
+            return cls(load(path))
+        except FileNotFoundError:
+            if not build_missing:
+                raise
+        table = solve()
+        save(table, path)
+        return cls(table)
+
+    def lookup(self, state):
+        """
+        Returns (value, best_moves, distance) for state, with best_moves as a
+        sorted list of actions on state's own board, or None if the position
+        cannot arise in a 3x3 game started from the empty board.
+        """
+        if state.geom is not DEFAULT_GEOMETRY:
+            return None
+        key, s = canonical(state)
+        record = self.table.get(key)
+        if record is None:
+            return None
+        value, moves, dist = record
+        best = sorted(from_canonical_action(a, s) for a in range(9) if (moves >> a) & 1)
+        return value, best, dist
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Tic-Tac-Toe and write the perfect-play table.")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="Output file")
+    args = parser.parse_args()
+
+    table = solve()
+    save(table, args.out)
+    print(f"Wrote {len(table)} positions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
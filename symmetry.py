@@ -0,0 +1,163 @@
+# symmetry.py
+#
+# The symmetries of the board: for a square board the 8 maps of the dihedral
+# group D4 (4 rotations, each optionally mirrored), for a rectangular one the
+# 4 that keep its shape (identity, half turn and the two mirrors). A position
+# and its images under these maps have the same game value, so caches can
+# share one entry per class and searches only need to try one move from each
+# group of equivalent moves.
+#
+# canonical() returns the symmetry it used as an opaque value; pass it to
+# to_canonical_action() / from_canonical_action() to move actions between the
+# original and the canonical board.
+
+from game import DEFAULT_GEOMETRY
+
+# tables for boards up to this many cells map a whole mask in one lookup
+_MASK_TABLE_CELLS = 12
+# per-board cap on the unique_actions cache
+_UNIQUE_CACHE_SIZE = 200000
+
+
+def _permutations(rows, cols):
+    """perm[s][i] is the cell that cell i is sent to by symmetry s."""
+    def cell_maps():
+        if rows == cols:
+            n = rows
+            for s in range(8):
+                def f(r, c, s=s):
+                    for _ in range(s % 4):          # rotate 90 degrees clockwise
+                        r, c = c, n - 1 - r
+                    if s >= 4:                      # then mirror left-right
+                        c = n - 1 - c
+                    return r, c
+                yield f
+        else:
+            yield lambda r, c: (r, c)
+            yield lambda r, c: (rows - 1 - r, cols - 1 - c)
+            yield lambda r, c: (r, cols - 1 - c)
+            yield lambda r, c: (rows - 1 - r, c)
+
+    perms = []
+    for f in cell_maps():
+        perm = [0] * (rows * cols)
+        for r in range(rows):
+            for c in range(cols):
+                rr, cc = f(r, c)
+                perm[r * cols + c] = rr * cols + cc
+        perms.append(tuple(perm))
+    return tuple(perms)
+
+
+def _permute_mask(mask, perm):
+    out = 0
+    for i, j in enumerate(perm):
+        if (mask >> i) & 1:
+            out |= 1 << j
+    return out
+
+
+class _BoardSymmetries:
+    """Symmetry tables for one board geometry."""
+
+    def __init__(self, geom):
+        self.geom = geom
+        perms = _permutations(geom.rows, geom.cols)
+        inverses = tuple(tuple(sorted(range(len(p)), key=p.__getitem__)) for p in perms)
+        # the opaque symmetry values handed out by canonical()
+        self.symmetries = tuple(zip(perms, inverses))
+        # mask_maps[s][mask] is mask transformed by symmetry s
+        if geom.cells <= _MASK_TABLE_CELLS:
+            self.mask_maps = tuple(
+                tuple(_permute_mask(m, p) for m in range(geom.full_mask + 1)) for p in perms
+            )
+        else:
+            self.mask_maps = None
+        self.unique_cache = {}
+
+    def transform(self, s_index, mask):
+        if self.mask_maps is not None:
+            return self.mask_maps[s_index][mask]
+        return _permute_mask(mask, self.symmetries[s_index][0])
+
+
+_tables = {}
+
+
+def board_symmetries(geom=DEFAULT_GEOMETRY):
+    tables = _tables.get(geom)
+    if tables is None:
+        tables = _tables[geom] = _BoardSymmetries(geom)
+    return tables
+
+
+# 3x3 tables, for code that only handles the classic board
+_DEFAULT = board_symmetries(DEFAULT_GEOMETRY)
+SYMMETRIES = tuple(p for p, _ in _DEFAULT.symmetries)
+INVERSES = tuple(inv for _, inv in _DEFAULT.symmetries)
+MASK_MAPS = _DEFAULT.mask_maps
+
+
+def canonical(state):
+    """
+    Returns (key, s): key is the smallest GameState.key() over the images
+    of state, and s is the symmetry that maps state onto that image.
+    """
+    tables = board_symmetries(state.geom)
+    cells = state.geom.cells
+    x, o = state.x_mask, state.o_mask
+    best_key, best_s = None, 0
+    for s in range(len(tables.symmetries)):
+        k = tables.transform(s, x) | (tables.transform(s, o) << cells)
+        if best_key is None or k < best_key:
+            best_key, best_s = k, s
+    return best_key | ((state.to_move == 'O') << (2 * cells)), tables.symmetries[best_s]
+
+
+def canonical_key(state):
+    return canonical(state)[0]
+
+
+def to_canonical_action(action, s):
+    """Maps an action on the original board onto the canonical board."""
+    return s[0][action]
+
+
+def from_canonical_action(action, s):
+    """Maps an action on the canonical board back to the original board."""
+    return s[1][action]
+
+
+def unique_actions(state):
+    """
+    Legal actions with symmetric duplicates removed.
+    Returns (action, count) pairs, where count is how many legal actions are
+    equivalent to action. The kept action is the lowest index of its group,
+    so picking the first best move gives the same answer as a full scan.
+    """
+    tables = board_symmetries(state.geom)
+    x, o = state.x_mask, state.o_mask
+    cache_key = x | (o << state.geom.cells)
+    cache = tables.unique_cache
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    # symmetries that leave this position unchanged
+    fixing = [tables.symmetries[s][0] for s in range(1, len(tables.symmetries))
+              if tables.transform(s, x) == x and tables.transform(s, o) == o]
+    occupied = x | o
+    seen = 0
+    result = []
+    for a in range(state.geom.cells):
+        if (occupied >> a) & 1 or (seen >> a) & 1:
+            continue
+        orbit = 1 << a
+        for perm in fixing:
+            orbit |= 1 << perm[a]
+        seen |= orbit
+        result.append((a, orbit.bit_count()))
+    if len(cache) >= _UNIQUE_CACHE_SIZE:
+        cache.clear()
+    cache[cache_key] = result
+    return result
@@ -0,0 +1,71 @@
+# table_agent.py
+from agent_base import Agent
+from game import GameState
+from alphabeta_agent import AlphaBetaAgent
+from solution_table import SolutionTable, DEFAULT_PATH
+from position_db import PositionDB
+
+class TableAgent(Agent):
+    """
+    Plays by looking moves up in a precomputed table instead of searching.
+    The table is loaded once, when the agent is created, and built first if
+    the file does not exist.
+
+    path:   a solution table (solution_table.py) file, or
+    db:     a memory-mapped position database (position_db.py) file, which
+            also allows values="expectimax" to replay ExpectimaxAgent's
+            full-depth choices.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, table=None, db=None, values="minimax"):
+        super().__init__()
+        if values not in ("minimax", "expectimax"):
+            raise ValueError(f"Unknown table values: {values}")
+        if table is None:
+            table = PositionDB.open(db) if db is not None else SolutionTable.from_file(path)
+        if values == "expectimax" and not hasattr(table, "expectimax"):
+            raise ValueError("expectimax values need a position database (db=...)")
+        self.table = table
+        self.values = values
+        # used only for positions that cannot come up from the empty board
+        self.fallback = AlphaBetaAgent()
+
+    def enable_stats(self):
+        """Counts each table probe as one node; fallback searches add theirs."""
+        stats = super().enable_stats()
+        self.fallback.stats = stats
+        return stats
+
+    def get_action(self, state: GameState, depth=None):
+        """
+        Returns the best move index (0-8). depth is ignored: the table always
+        holds the full-depth answer. Other board sizes fall back to search.
+        """
+        if self.stats is not None:
+            self.stats.enter(0)
+        if self.values == "expectimax":
+            record = self.table.expectimax(state)
+            if record is None:
+                return self._fallback_action(state, depth)
+            self.last_value, action = record
+            # same fallback as ExpectimaxAgent.get_action at chance nodes
+            if action is None:
+                legal = state.get_legal_actions()
+                if legal:
+                    action = legal[0]
+            return action
+
+        record = self.lookup(state)
+        if record is None or not record[1]:
+            return self._fallback_action(state, depth)
+        self.last_value = record[0]
+        return record[1][0]
+
+    def _fallback_action(self, state, depth):
+        action = self.fallback.get_action(state, depth)
+        self.last_value = self.fallback.last_value
+        return action
+
+    def lookup(self, state):
+        """(value, best_moves, distance) for state, or None if not in the table."""
+        return self.table.lookup(state)
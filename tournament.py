@@ -0,0 +1,330 @@
+# tournament.py
+#
+# Plays many games between agents in a process pool and streams one record
+# per finished game to a JSONL or CSV file. The schedule is every agent
+# pairing x every depth x every seed; the seed picks the random opening
+# moves (--opening-plies), so with no opening plies all seeds of a pairing
+# replay the same game.
+#
+# Memory stays flat however many games are played: the schedule is
+# generated lazily, only a few batches are in flight at a time, records
+# are written as they arrive, and the summary uses online statistics.
+#
+# Usage:
+#   python tournament.py --agents AlphaBetaAgent,ExpectimaxAgent --depths 2,4,full \
+#       --seeds 100 --opening-plies 2 --jobs 8 --out results.jsonl
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from agent_base import timed_get_action
+from game import GameState, parse_board_size
+from measure_metrics import make_agent
+from online_stats import RunningStats, LogHistogram
+
+AGENTS = ["MinimaxAgent", "AlphaBetaAgent", "ExpectimaxAgent", "TableAgent",
+          "NegamaxAgent", "PVSAgent", "MTDfAgent", "MCTSAgent"]
+CSV_FIELDS = ["game", "x", "o", "depth", "seed", "rows", "cols", "k", "outcome",
+              "opening", "actions", "ms", "nodes"]
+
+# worker process globals
+_config = None
+_cached_agents = {}
+
+
+def _init_worker(config):
+    global _config
+    _config = config
+
+
+def _get_agent(name):
+    # table lookups keep no state between games, so the table is loaded once
+    # per process; searching agents start every game with empty tables
+    if name == "TableAgent":
+        agent = _cached_agents.get(name)
+        if agent is None:
+            agent = _cached_agents[name] = make_agent(name, **_config["agent_options"])
+        return agent
+    return make_agent(name, **_config["agent_options"])
+
+
+def schedule(agents, depths, seeds, matrix=False):
+    """Yields (game, x, o, depth, seed) lazily, in a fixed order."""
+    if matrix:
+        pairs = itertools.product(agents, repeat=2)
+    else:
+        pairs = itertools.permutations(agents, 2)
+    games = itertools.product(list(pairs), depths, range(seeds))
+    for i, ((x, o), depth, seed) in enumerate(games):
+        yield i, x, o, depth, seed
+
+
+def play_recorded_game(agentX, agentO, depth, seed, rows=3, cols=3, k=3, opening_plies=0):
+    """Plays one game and returns its record: outcome plus per-move times and nodes."""
+    state = GameState(rows=rows, cols=cols, k=k)
+    rng = random.Random(seed)
+    opening = []
+    for _ in range(opening_plies):
+        if state.is_terminal():
+            break
+        action = rng.choice(state.get_legal_actions())
+        state.make_move(action)
+        opening.append(action)
+
+    actions, times, nodes = [], [], []
+    while not state.is_terminal():
+        agent = agentX if state.to_move == 'X' else agentO
+        action, ms = timed_get_action(agent, state, depth)
+        state.make_move(action)
+        actions.append(action)
+        times.append(round(ms, 4))
+        nodes.append(agent.stats.nodes)
+
+    winner = state.winner()
+    return {
+        "x": type(agentX).__name__, "o": type(agentO).__name__,
+        "depth": depth, "seed": seed, "rows": rows, "cols": cols, "k": k,
+        "outcome": winner if winner is not None else "draw",
+        "opening": opening, "actions": actions, "ms": times, "nodes": nodes,
+    }
+
+
+def _play_batch(batch):
+    records = []
+    for game, x, o, depth, seed in batch:
+        record = play_recorded_game(_get_agent(x), _get_agent(o), depth, seed,
+                                    _config["rows"], _config["cols"], _config["k"],
+                                    _config["opening_plies"])
+        # scheduled names, so agents playing from a book (BookAgent) keep theirs
+        records.append({"game": game, **record, "x": x, "o": o})
+    return records
+
+
+class Summary:
+    """Online aggregate of game records: latency and nodes per agent, results per pairing."""
+
+    def __init__(self):
+        self.games = 0
+        self.latency = {}     # agent -> (RunningStats, LogHistogram) of ms per move
+        self.nodes = {}       # agent -> RunningStats of nodes per move
+        self.results = {}     # (x, o, depth) -> [X wins, O wins, draws]
+        self.scores = {}      # agent -> [wins, draws, losses]
+
+    def add(self, record):
+        self.games += 1
+        x, o = record["x"], record["o"]
+        # the first agent move is X's unless the opening left O to move
+        player = 'X' if len(record["opening"]) % 2 == 0 else 'O'
+        for ms, n in zip(record["ms"], record["nodes"]):
+            name = x if player == 'X' else o
+            if name not in self.latency:
+                self.latency[name] = (RunningStats(), LogHistogram())
+                self.nodes[name] = RunningStats()
+            stats, hist = self.latency[name]
+            stats.add(ms)
+            hist.add(ms)
+            self.nodes[name].add(n)
+            player = 'O' if player == 'X' else 'X'
+
+        outcome = record["outcome"]
+        counts = self.results.setdefault((x, o, record["depth"]), [0, 0, 0])
+        counts[0 if outcome == 'X' else 1 if outcome == 'O' else 2] += 1
+        for name, me in ((x, 'X'), (o, 'O')):
+            score = self.scores.setdefault(name, [0, 0, 0])
+            score[1 if outcome == "draw" else 0 if outcome == me else 2] += 1
+
+    def print(self, out=sys.stdout):
+        print(f"\nGAMES: {self.games}", file=out)
+        print("\nLATENCY PER MOVE (ms):", file=out)
+        for name in sorted(self.latency):
+            stats, hist = self.latency[name]
+            print(f"  {name:16s} moves={stats.n}  mean={stats.mean:.3f}  "
+                  f"p50={hist.quantile(0.50):.3f}  p95={hist.quantile(0.95):.3f}  "
+                  f"p99={hist.quantile(0.99):.3f}  max={stats.max:.3f}  "
+                  f"nodes/move={self.nodes[name].mean:.1f}", file=out)
+        print("\nRESULTS (X wins / O wins / draws):", file=out)
+        for (x, o, depth), (xw, ow, dr) in sorted(self.results.items(),
+                                                  key=lambda kv: (kv[0][0], kv[0][1], str(kv[0][2]))):
+            n = xw + ow + dr
+            print(f"  X={x:16s} O={o:16s} depth={'full' if depth is None else depth:>4}  "
+                  f"{100.0 * xw / n:5.1f}% / {100.0 * ow / n:5.1f}% / {100.0 * dr / n:5.1f}%  "
+                  f"({n} games)", file=out)
+        print("\nPER AGENT (win / draw / loss):", file=out)
+        for name in sorted(self.scores):
+            w, d, l = self.scores[name]
+            n = w + d + l
+            print(f"  {name:16s} {100.0 * w / n:5.1f}% / {100.0 * d / n:5.1f}% / "
+                  f"{100.0 * l / n:5.1f}%  ({n} games)", file=out)
+
+
+class RecordWriter:
+    """Writes game records as JSON lines or CSV rows (lists space-separated)."""
+
+    def __init__(self, path, fmt=None):
+        if fmt is None:
+            fmt = "csv" if path.endswith(".csv") else "jsonl"
+        self.fmt = fmt
+        self.f = open(path, "w", newline="")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.f, fieldnames=CSV_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == "csv":
+            row = dict(record)
+            for field in ("opening", "actions", "ms", "nodes"):
+                row[field] = " ".join(str(v) for v in record[field])
+            if row["depth"] is None:
+                row["depth"] = "full"
+            self.csv.writerow(row)
+        else:
+            self.f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def _batches(games, size):
+    it = iter(games)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_tournament(games, config, writer=None, jobs=None, batch_size=16):
+    """
+    Plays every game of the schedule and returns the Summary. Records go to
+    writer as each batch finishes (in completion order, see "game").
+    jobs=1 plays in this process.
+    """
+    summary = Summary()
+
+    def consume(records):
+        for record in records:
+            summary.add(record)
+            if writer is not None:
+                writer.write(record)
+        if writer is not None:
+            writer.flush()
+
+    if jobs == 1:
+        _init_worker(config)
+        for batch in _batches(games, batch_size):
+            consume(_play_batch(batch))
+        return summary
+
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(config,)) as executor:
+        batches = _batches(games, batch_size)
+        pending = set()
+        # keep a couple of batches per worker queued, no more
+        for batch in itertools.islice(batches, 2 * jobs):
+            pending.add(executor.submit(_play_batch, batch))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                consume(future.result())
+                batch = next(batches, None)
+                if batch is not None:
+                    pending.add(executor.submit(_play_batch, batch))
+    return summary
+
+
+def parse_depths(text):
+    """"2,4,full" -> [2, 4, None]."""
+    return [None if d in ("full", "none") else int(d) for d in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a round-robin tournament in a process pool.")
+    parser.add_argument("--agents", default="AlphaBetaAgent,ExpectimaxAgent",
+                        help=f"Comma-separated agents ({', '.join(AGENTS)})")
+    parser.add_argument("--matrix", action="store_true",
+                        help="Play every ordered pair including self-play "
+                             "(default: distinct agents, both colors)")
+    parser.add_argument("--depths", type=parse_depths, default=[None],
+                        help="Comma-separated depth limits, 'full' for none (default: full)")
+    parser.add_argument("--seeds", type=int, default=1, help="Games per pairing and depth")
+    parser.add_argument("--opening-plies", type=int, default=0,
+                        help="Random moves (chosen by the seed) before the agents take over")
+    parser.add_argument("--size", type=parse_board_size, default=(3, 3),
+                        help="Board size, N or ROWSxCOLS (default: 3)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="Marks in a row needed to win (default: the board's shorter side)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Games played in parallel (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Games per pool task")
+    parser.add_argument("--out", default=None, help="Stream game records to this .jsonl or .csv file")
+    parser.add_argument("--format", default=None, choices=["jsonl", "csv"],
+                        help="Record format (default: from the --out extension)")
+    parser.add_argument("--tt-size", type=int, default=None,
+                        help="Enable a transposition table with this many entries per agent")
+    parser.add_argument("--tt-policy", default="lru", choices=["lru", "fifo"],
+                        help="Transposition table eviction policy")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="Key the table on symmetry-canonical positions and skip symmetric moves")
+    parser.add_argument("--time-ms", type=float, default=None,
+                        help="Per-move time budget for AlphaBetaAgent (iterative deepening) "
+                             "and MCTSAgent")
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="MCTSAgent iterations per move (when --time-ms is not set)")
+    parser.add_argument("--ordering", default=None,
+                        help="Comma-separated AlphaBetaAgent move ordering strategies")
+    parser.add_argument("--table", default="solution_table.bin",
+                        help="Solution table file for TableAgent (built if missing)")
+    parser.add_argument("--endgame", type=int, default=None,
+                        help="Hybrid mode: solve positions at the depth limit with at most N empty cells")
+    parser.add_argument("--extend", action="store_true",
+                        help="Hybrid mode: search forcing positions one ply further")
+    parser.add_argument("--book", default=None,
+                        help="Comma-separated opening books; each agent plays from its own")
+    args = parser.parse_args()
+
+    agents = args.agents.split(",")
+    for name in agents:
+        if name not in AGENTS:
+            parser.error(f"unknown agent: {name}")
+    rows, cols = args.size
+    config = {
+        "rows": rows, "cols": cols,
+        "k": args.k if args.k is not None else min(rows, cols),
+        "opening_plies": args.opening_plies,
+        "agent_options": {
+            "tt_size": args.tt_size, "tt_policy": args.tt_policy, "symmetry": args.symmetry,
+            "table_path": args.table, "time_ms": args.time_ms, "iterations": args.iterations,
+            "ordering": tuple(args.ordering.split(",")) if args.ordering else None,
+            "books": tuple(args.book.split(",")) if args.book else (),
+            "endgame": args.endgame, "extend": args.extend,
+        },
+    }
+    if "TableAgent" in agents:
+        # build the table once here rather than in every worker at once
+        make_agent("TableAgent", table_path=args.table)
+
+    writer = RecordWriter(args.out, args.format) if args.out else None
+    t0 = time.perf_counter()
+    try:
+        summary = run_tournament(schedule(agents, args.depths, args.seeds, args.matrix),
+                                 config, writer, args.jobs, args.batch_size)
+    finally:
+        if writer is not None:
+            writer.close()
+    summary.print()
+    print(f"\nElapsed: {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
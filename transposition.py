@@ -0,0 +1,71 @@
+# transposition.py
+
+from collections import OrderedDict
+
+# Bound types for stored values.
+EXACT = 0   # value is the true search value
+LOWER = 1   # search failed high, true value >= value
+UPPER = 2   # search failed low, true value <= value
+
+
+class TranspositionTable:
+    """
+    Cache of searched positions that the agents keep across get_action calls
+    and games.
+    Maps a position key (GameState.key()) to a tuple
+    (value, best_action, depth, flag), where depth is the remaining search
+    depth the value was computed with and flag is EXACT, LOWER or UPPER.
+
+    max_size bounds the number of entries. When the table is full, policy
+    picks the entry to evict: "lru" drops the least recently used entry,
+    "fifo" drops the oldest stored one.
+    """
+
+    def __init__(self, max_size=100000, policy="lru"):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        if policy not in ("lru", "fifo"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_size = max_size
+        self.policy = policy
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def probe(self, key):
+        """Return the stored entry for key, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == "lru":
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, value, action, depth, flag=EXACT):
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = (value, action, depth, flag)
+        self.stores += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }